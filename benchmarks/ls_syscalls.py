@@ -0,0 +1,83 @@
+"""Замер `ls -l` на большом каталоге: время и число системных вызовов на элемент.
+
+Запуск из корня репозитория::
+
+    python -m benchmarks.ls_syscalls [entries]
+
+Системные вызовы считаются через ``strace -f -c``, если он установлен;
+иначе выводится только время.
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from src.commands import ls
+from src.commands.utils import MetadataCache
+
+DEFAULT_ENTRIES = 20_000
+STAT_CALLS = ("newfstatat", "fstatat64", "statx", "lstat", "stat", "readlink")
+
+
+def populate(root: Path, entries: int) -> None:
+    """Создаёт каталог с файлами и небольшой долей символических ссылок."""
+    for number in range(entries):
+        path = root / f"file{number:06d}.txt"
+        if number % 100 == 99:
+            os.symlink(f"file{number - 1:06d}.txt", path)
+        else:
+            path.write_bytes(b"x" * (number % 512))
+
+
+def list_once(root: Path) -> float:
+    """Выполняет `ls -l` и возвращает затраченное время в секундах."""
+    started = time.perf_counter()
+    ls.run(["-l"], SimpleNamespace(cwd=root, fs_cache=MetadataCache()))
+    return time.perf_counter() - started
+
+
+def count_syscalls(root: Path, entries: int) -> None:
+    """Повторяет замер под strace и печатает stat-вызовы на элемент."""
+    command = [
+        "strace", "-f", "-c", "-e", "trace=%file,getdents64",
+        sys.executable, "-m", "benchmarks.ls_syscalls", "--child", str(root),
+    ]
+    completed = subprocess.run(
+        command, capture_output=True, text=True, check=True)
+    calls: dict[str, int] = {}
+    for line in completed.stderr.splitlines():
+        parts = line.split()
+        if len(parts) >= 5 and parts[-1] in STAT_CALLS + ("getdents64",):
+            calls[parts[-1]] = int(parts[3])
+    for name, count in sorted(calls.items()):
+        print(f"  {name:<12} {count:>9} ({count / entries:.2f} per entry)")
+    stats_total = sum(calls.get(name, 0) for name in STAT_CALLS)
+    print(f"stat-family calls per entry: {stats_total / entries:.2f}")
+
+
+def main() -> None:
+    """Точка входа замера."""
+    if sys.argv[1:2] == ["--child"]:
+        list_once(Path(sys.argv[2]))
+        return
+
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ENTRIES
+    with tempfile.TemporaryDirectory() as directory:
+        root = Path(directory)
+        populate(root, entries)
+        list_once(root)
+        elapsed = min(list_once(root) for _ in range(3))
+        print(f"ls -l over {entries} entries: {elapsed * 1000:.1f} ms "
+              f"({entries / elapsed:,.0f} entries/s)")
+        if shutil.which("strace"):
+            count_syscalls(root, entries)
+        else:
+            print("strace not found: syscall counts skipped")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,86 @@
 import logging
-from .utils import CommandError, resolve_path
+import os
+import sys
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+from src import config
+
+from .utils import (
+    CommandError,
+    decode_chunks,
+    has_os_descriptor,
+    open_decompressed,
+    read_chunks,
+    resolve_path,
+)
 
 logger = logging.getLogger("shell")
 
 
-def run(args: list[str], shell) -> str:
-    """Возвращает содержимое указанного файла."""
-    if len(args) != 1:
-        raise CommandError("Usage: cat <file>")
+def run(args: list[str], shell) -> Iterator[str]:
+    """Выводит содержимое файлов потоком, распаковывая gzip, bzip2 и xz."""
+    if not args:
+        raise CommandError("Usage: cat <file>...")
+
+    cache = shell.fs_cache
+    paths: list[Path] = []
+    for raw in args:
+        file_path = resolve_path(raw, shell.cwd, cache)
+        if not cache.exists(file_path):
+            raise CommandError(f"cat: '{file_path}' not found")
+        if cache.is_dir(file_path):
+            raise CommandError("cat: target must be a file")
+        paths.append(file_path)
+
+    return _iter_files(paths)
 
-    file_path = resolve_path(args[0], shell.cwd)
 
-    if not file_path.exists():
-        raise CommandError(f"cat: '{file_path}' not found")
-    if file_path.is_dir():
-        raise CommandError("cat: target must be a file")
+def _iter_files(paths: list[Path]) -> Iterator[str]:
+    """Отдаёт текст файлов по блокам, не держа файл в памяти целиком."""
+    for file_path in paths:
+        try:
+            with open_decompressed(file_path) as handle:
+                target = _zero_copy_target(handle)
+                if target is None or not _send_file(handle, target):
+                    yield from decode_chunks(
+                        read_chunks(handle, config.CAT_CHUNK_SIZE))
+        except OSError as error:
+            raise CommandError(
+                f"cat: failed to read '{file_path}': {error}") from error
+        logger.debug("cat read %s", file_path)
 
+
+def _zero_copy_target(handle: BinaryIO) -> int | None:
+    """Возвращает дескриптор stdout, если в него можно писать через sendfile.
+
+    Это возможно, когда stdout — канал или файл, а не терминал, и сам
+    файл открыт через настоящий дескриптор ОС.
+    """
+    if not hasattr(os, "sendfile") or not has_os_descriptor(handle):
+        return None
+    stream = sys.stdout
     try:
-        content = file_path.read_text(encoding="utf-8")
-    except UnicodeDecodeError:
-        content = file_path.read_text(encoding="utf-8", errors="ignore")
+        if stream.isatty():
+            return None
+        target = stream.fileno()
+    except (AttributeError, OSError, ValueError):
+        return None
+    stream.flush()
+    return target
+
 
-    logger.debug("cat read %s", file_path)
-    return content
+def _send_file(handle: BinaryIO, target: int) -> bool:
+    """Копирует файл в stdout средствами ядра; False — нужен обычный вывод."""
+    source = handle.fileno()
+    offset = start = handle.tell()
+    while True:
+        try:
+            sent = os.sendfile(target, source, offset, config.CAT_CHUNK_SIZE)
+        except OSError:
+            if offset == start:
+                return False
+            raise
+        if sent == 0:
+            return True
+        offset += sent
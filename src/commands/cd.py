@@ -11,11 +11,12 @@ def run(args: list[str], shell_state) -> str:
     if not args:
         new = Path.home()
     else:
-        new = resolve_path(args[0], shell_state.cwd)
+        new = resolve_path(args[0], shell_state.cwd, shell_state.fs_cache)
 
-    if not new.exists():
+    cache = shell_state.fs_cache
+    if not cache.exists(new):
         raise CommandError(f"cd: {new}: No such file or directory")
-    if not new.is_dir():
+    if not cache.is_dir(new):
         raise CommandError(f"cd: {new}: Not a directory")
 
     shell_state.cwd = new
@@ -1,56 +1,278 @@
+import hashlib
 import logging
+import os
 import shutil
+from collections import Counter
+from functools import partial
 from pathlib import Path
-from .utils import CommandError, resolve_path
+from typing import Iterator
+
+from src import config
+
+from .utils import (
+    CommandError,
+    MetadataCache,
+    copy_file,
+    map_ordered,
+    move_to_trash,
+    resolve_path,
+    walk_tree,
+)
 
 logger = logging.getLogger("shell")
 
+USAGE = "Usage: cp [-r] [-v] [-u [--checksum] [--delete]] <source> <destination>"
+FLAGS = {
+    "-r": "recursive",
+    "-v": "verbose",
+    "-u": "update",
+    "--checksum": "checksum",
+    "--delete": "delete",
+}
+
+CopyTask = tuple[str, str]
+CopyResult = tuple[bool, str | None, int]
+
 
-def _resolve_destination(source: Path, raw_destination: Path) -> Path:
+def _resolve_destination(source: Path, raw_destination: Path,
+                         cache: MetadataCache) -> Path:
     """Возвращает итоговый путь копирования с учётом каталогов."""
-    if raw_destination.exists() and raw_destination.is_dir():
+    if cache.is_dir(raw_destination):
         return raw_destination / source.name
     return raw_destination
 
 
 def run(args: list[str], shell) -> str:
-    """Копирует файл или каталог, поддерживая ключ -r."""
-    recursive = False
-    positional: list[str] = []
-
-    for arg in args:
-        if arg == "-r":
-            recursive = True
-        elif arg.startswith("-"):
-            raise CommandError(f"cp: unsupported option '{arg}'")
-        else:
-            positional.append(arg)
-
+    """Копирует файл или каталог; с -u досылает только изменившиеся файлы."""
+    options, positional = _parse_options(args)
     if len(positional) != 2:
-        raise CommandError("Usage: cp [-r] <source> <destination>")
+        raise CommandError(USAGE)
 
-    source = resolve_path(positional[0], shell.cwd)
-    destination_raw = resolve_path(positional[1], shell.cwd)
+    cache = shell.fs_cache
+    source = resolve_path(positional[0], shell.cwd, cache)
+    destination_raw = resolve_path(positional[1], shell.cwd, cache)
 
-    if not source.exists():
+    if not cache.exists(source):
         raise CommandError(f"cp: source '{source}' not found")
-    if source.is_dir() and not recursive:
+    source_is_dir = cache.is_dir(source)
+    if source_is_dir and not options["recursive"]:
         raise CommandError("cp: -r required to copy directories")
+    if options["delete"] and not source_is_dir:
+        raise CommandError("cp: --delete requires a directory source")
 
-    destination = _resolve_destination(source, destination_raw)
+    destination = _resolve_destination(source, destination_raw, cache)
+    if source_is_dir and (destination == source
+                          or source in destination.parents):
+        raise CommandError(
+            f"cp: cannot copy a directory, '{source}', "
+            f"into itself, '{destination}'"
+        )
     destination.parent.mkdir(parents=True, exist_ok=True)
+    options["trash_root"] = (
+        shell.trash_dir
+        if options["update"] and os.path.lexists(destination) else None
+    )
 
+    report = _new_report()
     try:
-        if source.is_dir():
-            shutil.copytree(source, destination, dirs_exist_ok=True)
+        if source_is_dir:
+            _copy_tree(source, destination, options, report)
             kind = "directory"
         else:
-            shutil.copy2(source, destination)
+            task = (str(source), str(destination))
+            _record(report, _copy_entry(task, options=options, report=report))
             kind = "file"
     except Exception as error:
         logger.exception("cp failed: %s", error)
+        if options["trash_root"] is not None \
+                and (report["created"] or report["trashed"]):
+            shell.push_undo(_undo_action(destination, options, report))
         raise CommandError(f"cp: failed to copy: {error}") from error
+    finally:
+        cache.invalidate(destination)
 
-    shell.push_undo({"command": "cp", "target": str(destination)})
+    shell.push_undo(_undo_action(destination, options, report))
     logger.debug("cp %s -> %s", source, destination)
-    return f"Copied {kind} '{source}' -> '{destination}'"
+    if options["update"]:
+        message = (
+            f"Synced {kind} '{source}' -> '{destination}': "
+            f"{report['copied']} copied, {report['skipped']} skipped, "
+            f"{report['bytes']} bytes transferred"
+        )
+        if options["delete"]:
+            message += f", {report['deleted']} deleted"
+    else:
+        message = f"Copied {kind} '{source}' -> '{destination}'"
+    if options["verbose"]:
+        message += f" ({_describe_modes(report['modes'])})"
+    return message
+
+
+def _parse_options(args: list[str]) -> tuple[dict, list[str]]:
+    """Разбирает ключи cp и возвращает их вместе с позиционными аргументами."""
+    options: dict = dict.fromkeys(FLAGS.values(), False)
+    positional: list[str] = []
+
+    for arg in args:
+        if arg in FLAGS:
+            options[FLAGS[arg]] = True
+        elif arg.startswith("-"):
+            raise CommandError(f"cp: unsupported option '{arg}'")
+        else:
+            positional.append(arg)
+
+    if (options["checksum"] or options["delete"]) and not options["update"]:
+        raise CommandError("cp: --checksum and --delete require -u")
+    return options, positional
+
+
+def _describe_modes(modes: Counter) -> str:
+    """Описывает, какими способами копировались файлы."""
+    if not modes:
+        return "no files copied"
+    return ", ".join(f"{mode}: {count}" for mode, count in modes.most_common())
+
+
+def _new_report() -> dict:
+    """Создаёт пустую сводку копирования.
+
+    Кроме счётчиков в ней копятся созданные пути и пары (путь, корзина)
+    для вытесненных и удалённых элементов — по ним undo откатывает -u.
+    """
+    return {"modes": Counter(), "copied": 0, "skipped": 0, "bytes": 0,
+            "deleted": 0, "created": [], "trashed": []}
+
+
+def _record(report: dict, result: CopyResult) -> None:
+    """Добавляет результат копирования одного элемента в счётчики сводки."""
+    copied, mode, size = result
+    if not copied:
+        report["skipped"] += 1
+        return
+    report["copied"] += 1
+    report["bytes"] += size
+    if mode is not None:
+        report["modes"][mode] += 1
+
+
+def _undo_action(destination: Path, options: dict, report: dict) -> dict:
+    """Собирает запись для undo; для -u поверх приёмника — с путями отката."""
+    action: dict = {"command": "cp", "target": str(destination)}
+    if options["trash_root"] is not None:
+        action["created"] = report["created"]
+        action["trashed"] = report["trashed"]
+    return action
+
+
+def _copy_tree(source: Path, destination: Path, options: dict,
+               report: dict) -> None:
+    """Копирует дерево каталогов, распределяя файлы по пулу потоков.
+
+    Дерево обходится один раз: каталоги создаются в основном потоке до
+    того, как их файлы уходят в пул, а метаданные каталогов переносятся
+    в конце, от глубоких к верхним, чтобы запись файлов их не сбила.
+    Символические ссылки разыменовываются, как в copytree(symlinks=False):
+    копируется содержимое файла или каталога, на который они указывают.
+    Итоги копирования накапливаются в ``report``.
+    """
+    directories: list[tuple[str, str]] = [(str(source), str(destination))]
+    expected: set[str] = set()
+    destination.mkdir(parents=True, exist_ok=True)
+
+    def tasks(top: str, target_top: str) -> Iterator[CopyTask]:
+        for entry in walk_tree(Path(top), prune=(), include_dirs=True):
+            target = os.path.join(target_top, os.path.relpath(entry.path, top))
+            expected.add(os.path.relpath(target, destination))
+            if entry.is_dir():
+                if not os.path.isdir(target):
+                    _make_room(target, options["trash_root"], report)
+                    os.makedirs(target)
+                directories.append((entry.path, target))
+                if entry.is_symlink():
+                    yield from tasks(entry.path, target)
+            else:
+                yield entry.path, target
+
+    copy = partial(_copy_entry, options=options, report=report)
+    for result in map_ordered(copy, tasks(str(source), str(destination)),
+                              config.CP_WORKERS):
+        _record(report, result)
+    if options["delete"] and options["trash_root"] is not None:
+        removed = _delete_extraneous(
+            destination, expected, options["trash_root"])
+        report["deleted"] = len(removed)
+        report["trashed"].extend(removed)
+    for source_dir, target_dir in reversed(directories):
+        shutil.copystat(source_dir, target_dir)
+
+
+def _copy_entry(task: CopyTask, options: dict, report: dict) -> CopyResult:
+    """Копирует один файл с метаданными, разыменовывая ссылки.
+
+    Возвращает, был ли файл скопирован, способ копирования и число
+    перенесённых байтов. В режиме -u актуальные файлы пропускаются, а
+    заменяемые сначала убираются в корзину.
+    """
+    source, target = task
+    if options["update"] and _is_up_to_date(source, target,
+                                            options["checksum"]):
+        return False, None, 0
+    _make_room(target, options["trash_root"], report)
+    mode = copy_file(source, target)
+    return True, mode, os.stat(target).st_size
+
+
+def _make_room(target: str, trash_root: Path | None, report: dict) -> None:
+    """Убирает прежнюю версию элемента в корзину и отмечает замену в сводке.
+
+    Запись делается до копирования, поэтому после сбоя посреди -u undo
+    всё равно знает, что удалить и что вернуть из корзины.
+    """
+    if trash_root is None or not os.path.lexists(target):
+        report["created"].append(target)
+        return
+    trash_path = move_to_trash(Path(target), trash_root)
+    report["trashed"].append([target, str(trash_path)])
+
+
+def _is_up_to_date(source: str, target: str, checksum: bool) -> bool:
+    """Сравнивает файлы по размеру и mtime, с --checksum — по содержимому."""
+    try:
+        target_stats = os.stat(target)
+    except FileNotFoundError:
+        return False
+    source_stats = os.stat(source)
+    if os.path.islink(target) or target_stats.st_size != source_stats.st_size:
+        return False
+    if checksum:
+        return _file_digest(source) == _file_digest(target)
+    return target_stats.st_mtime_ns == source_stats.st_mtime_ns
+
+
+def _file_digest(path: str) -> str:
+    """Возвращает SHA-256 содержимого файла."""
+    with open(path, "rb") as handle:
+        return hashlib.file_digest(handle, "sha256").hexdigest()
+
+
+def _delete_extraneous(destination: Path, expected: set[str],
+                       trash_root: Path) -> list[list[str]]:
+    """Убирает в корзину то, чего нет в источнике, и возвращает пары для undo.
+
+    Лишний каталог убирается целиком, его содержимое отдельно не считается.
+    """
+    prune = (trash_root.name,) if destination in trash_root.parents else ()
+    extraneous: list[str] = []
+    for entry in walk_tree(destination, prune=prune, include_dirs=True):
+        relative = os.path.relpath(entry.path, destination)
+        if relative in expected:
+            continue
+        if extraneous and relative.startswith(extraneous[-1] + os.sep):
+            continue
+        extraneous.append(relative)
+
+    removed: list[list[str]] = []
+    for relative in extraneous:
+        path = destination / relative
+        removed.append([str(path), str(move_to_trash(path, trash_root))])
+    return removed
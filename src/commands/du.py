@@ -0,0 +1,231 @@
+import logging
+import os
+import stat
+import threading
+from pathlib import Path
+from typing import Iterator
+
+from src import config
+
+from .utils import CommandError, map_ordered, resolve_path
+
+logger = logging.getLogger("shell")
+
+USAGE = "Usage: du [-s] [-h] [--depth N] <path>"
+SIZE_UNITS = ("K", "M", "G", "T", "P")
+
+Summary = tuple[int, list[str], list[tuple[int, int, int]]]
+Report = list[tuple[str, int]]
+
+
+def run(args: list[str], shell) -> Iterator[str]:
+    """Показывает, сколько места на диске занимают каталог и его подкаталоги."""
+    options, targets = _parse_options(args)
+    if len(targets) != 1:
+        raise CommandError(USAGE)
+
+    raw = targets[0]
+    root = resolve_path(raw, shell.cwd, shell.fs_cache)
+    try:
+        root_stats = os.lstat(root)
+    except FileNotFoundError as error:
+        raise CommandError(f"du: path '{root}' not found") from error
+
+    logger.debug("du executed with args: %s", args)
+    if not stat.S_ISDIR(root_stats.st_mode):
+        return iter([_format_line(_disk_usage(root_stats), raw, options)])
+    return _iter_report(root, raw, options, shell)
+
+
+def _parse_options(args: list[str]) -> tuple[dict, list[str]]:
+    """Разбирает ключи du и возвращает их вместе со списком целей."""
+    options: dict = {"summarize": False, "human": False, "depth": None}
+    targets: list[str] = []
+    position = 0
+
+    while position < len(args):
+        arg = args[position]
+        position += 1
+        if arg == "--depth" or arg.startswith("--depth="):
+            if arg == "--depth":
+                if position >= len(args):
+                    raise CommandError(USAGE)
+                value = args[position]
+                position += 1
+            else:
+                value = arg.partition("=")[2]
+            options["depth"] = _parse_depth(value)
+        elif arg.startswith("-") and len(arg) > 1:
+            for flag in arg[1:]:
+                if flag == "s":
+                    options["summarize"] = True
+                elif flag == "h":
+                    options["human"] = True
+                else:
+                    raise CommandError(f"du: unsupported option '{arg}'")
+        else:
+            targets.append(arg)
+
+    if options["summarize"]:
+        options["depth"] = 0
+    return options, targets
+
+
+def _parse_depth(value: str) -> int:
+    """Проверяет, что аргумент --depth — неотрицательное целое число."""
+    try:
+        depth = int(value)
+    except ValueError as error:
+        raise CommandError(
+            "du: --depth requires a non-negative integer") from error
+    if depth < 0:
+        raise CommandError("du: --depth requires a non-negative integer")
+    return depth
+
+
+def _iter_report(root: Path, raw: str, options: dict,
+                 shell) -> Iterator[str]:
+    """Считает поддеревья корня в пуле потоков и печатает их по готовности.
+
+    Жёсткие ссылки учитываются один раз на (st_dev, st_ino) для всего
+    обхода; какому каталогу достанется общий inode, зависит от порядка
+    завершения потоков, но итог по корню от него не зависит.
+    """
+    seen: set[tuple[int, int]] = set()
+    lock = threading.Lock()
+    root_text = str(root)
+    display_root = raw.rstrip("/") or raw
+
+    def display(path: str) -> str:
+        return display_root + path[len(root_text):]
+
+    try:
+        own, subdirs, linked = _scan_directory(root_text, shell)
+    except OSError as error:
+        raise CommandError(
+            f"du: cannot read directory '{root}': {error}") from error
+    total = own + _count_links(linked, seen, lock)
+
+    def size_child(name: str) -> tuple[int, Report]:
+        return _size_subtree(
+            os.path.join(root_text, name), 1, options, shell, seen, lock)
+
+    results = map_ordered(size_child, subdirs, config.DU_WORKERS)
+    for subtotal, report in results:
+        total += subtotal
+        for path, size in report:
+            yield _format_line(size, display(path), options)
+    yield _format_line(total, display_root, options)
+
+
+def _size_subtree(path: str, depth: int, options: dict, shell,
+                  seen: set[tuple[int, int]],
+                  lock: threading.Lock) -> tuple[int, Report]:
+    """Обходит поддерево в глубину и возвращает его итог и строки отчёта."""
+    report: Report = []
+    limit = options["depth"]
+    frame = _open_frame(path, depth, shell, seen, lock)
+    if frame is None:
+        return 0, report
+    stack = [frame]
+    total = 0
+
+    while stack:
+        frame = stack[-1]
+        current, level, subdirs, position, subtotal = frame
+        if position < len(subdirs):
+            frame[3] += 1
+            child = _open_frame(
+                os.path.join(current, subdirs[position]), level + 1,
+                shell, seen, lock)
+            if child is not None:
+                stack.append(child)
+            continue
+        stack.pop()
+        if limit is None or level <= limit:
+            report.append((current, subtotal))
+        if stack:
+            stack[-1][4] += subtotal
+        else:
+            total = subtotal
+
+    return total, report
+
+
+def _open_frame(path: str, depth: int, shell, seen: set[tuple[int, int]],
+                lock: threading.Lock) -> list | None:
+    """Читает сводку каталога и готовит кадр обхода для него."""
+    try:
+        own, subdirs, linked = _scan_directory(path, shell)
+    except OSError as error:
+        message = f"du: cannot read directory '{path}': {error}"
+        logger.error(message)
+        shell.notify(message)
+        return None
+    return [path, depth, subdirs, 0, own + _count_links(linked, seen, lock)]
+
+
+def _scan_directory(path: str, shell) -> Summary:
+    """Сканирует каталог: размер самого каталога и его файлов, подкаталоги.
+
+    Состав каталога берётся из кэша листингов оболочки, а файлы заново
+    опрашиваются через lstat: дописывание и усечение файла не меняют
+    mtime каталога. Файлы с несколькими жёсткими ссылками возвращаются
+    отдельно в виде (st_dev, st_ino, размер), чтобы учесть их один раз.
+    """
+    own = _disk_usage(os.lstat(path))
+    subdirs: list[str] = []
+    linked: list[tuple[int, int, int]] = []
+    for entry in shell.fs_cache.listing(path):
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.name)
+                continue
+            stats = os.lstat(entry.path)
+        except OSError:
+            continue
+        usage = _disk_usage(stats)
+        if stats.st_nlink > 1:
+            linked.append((stats.st_dev, stats.st_ino, usage))
+        else:
+            own += usage
+    subdirs.sort()
+    return own, subdirs, linked
+
+
+def _count_links(linked: list[tuple[int, int, int]],
+                 seen: set[tuple[int, int]], lock: threading.Lock) -> int:
+    """Учитывает размер inode с жёсткими ссылками только при первой встрече."""
+    total = 0
+    with lock:
+        for device, inode, usage in linked:
+            if (device, inode) not in seen:
+                seen.add((device, inode))
+                total += usage
+    return total
+
+
+def _disk_usage(stats: os.stat_result) -> int:
+    """Возвращает занятое на диске место в байтах (по блокам, если известны)."""
+    blocks = getattr(stats, "st_blocks", None)
+    if blocks is None:
+        return stats.st_size
+    return blocks * 512
+
+
+def _format_line(size: int, path: str, options: dict) -> str:
+    """Форматирует строку отчёта du."""
+    text = _human_size(size) if options["human"] else str(size)
+    return f"{text}\t{path}\n"
+
+
+def _human_size(size: int) -> str:
+    """Переводит размер в байтах в краткую форму с суффиксом K/M/G/T/P."""
+    if size < 1024:
+        return str(size)
+    value = float(size)
+    for unit in SIZE_UNITS:
+        value /= 1024
+        if value < 1024 or unit == SIZE_UNITS[-1]:
+            return f"{value:.1f}{unit}" if value < 10 else f"{value:.0f}{unit}"
+    return str(size)
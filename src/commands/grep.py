@@ -1,53 +1,91 @@
+import gzip
 import logging
+import mmap
 import re
+import sys
+import tarfile
+import time
+import zipfile
+from collections import deque
 from pathlib import Path
+from itertools import islice
+from typing import IO, Callable, Iterable, Iterator
 
-from .utils import CommandError, resolve_path
+from src import config
+
+from . import untar, unzip
+from .index import REGEX_METACHARACTERS, narrow_candidates, query_trigrams
+from .utils import (
+    CommandError,
+    MetadataCache,
+    compile_pattern,
+    compression_format,
+    has_os_descriptor,
+    looks_binary,
+    map_ordered,
+    open_decompressed,
+    resolve_path,
+    walk_tree,
+)
 
 logger = logging.getLogger("shell")
 
+LINE_ONLY_CONSTRUCTS = ("\\A", "\\Z", "(?=", "(?!", "(?<")
 
-def run(args: list[str], shell) -> str:
-    """Ищет строки, соответствующие шаблону, в файлах."""
-    if not args:
-        raise CommandError("Usage: grep [-r] [-i] <pattern> [path]")
+ARCHIVE_SUFFIXES = (".zip", ".tar.gz", ".tgz", ".tar", ".gz")
 
-    recursive = False
-    ignore_case = False
-    index = 0
+USAGE = (
+    "Usage: grep [-r] [-i] [-a|-I] [-z] [-l|-c|-q] [-m N] [-A N] [-B N] [-C N]"
+    " (<pattern> | -e <pattern>... | -f <file>) [path]"
+)
+VALUE_FLAGS = frozenset("mefABC")
+MODE_FLAGS = {"l": "files", "c": "count", "q": "quiet"}
 
-    while (
-        index < len(args)
-        and args[index].startswith("-")
-        and len(args[index]) > 1
-    ):
-        option = args[index][1:]
-        for flag in option:
-            if flag == "r":
-                recursive = True
-            elif flag == "i":
-                ignore_case = True
-            else:
-                raise CommandError(f"grep: unsupported option '-{flag}'")
-        index += 1
+Hit = tuple[int, str]
+Searcher = Callable[[bytes], Iterator[Hit]]
 
-    remaining = args[index:]
-    if not remaining:
-        raise CommandError("Usage: grep [-r] [-i] <pattern> [path]")
+ContextLine = tuple[int, str, bool]
+Found = list[Hit] | list[ContextLine]
+Section = tuple[str | None, Found, bool]
+
+NO_TEXT: Hit = (0, "")
+STREAM_BLOCK = 64 * 1024
+TRIE_MAX_NESTING = 100
+
+
+def run(args: list[str], shell) -> Iterator[str]:
+    """Ищет строки, соответствующие шаблону, в файлах, отдавая их потоком."""
+    if not args:
+        raise CommandError(USAGE)
 
-    pattern_text = remaining[0]
-    if len(remaining) > 2:
-        raise CommandError("Usage: grep [-r] [-i] <pattern> [path]")
+    options, index = _parse_options(args)
+    recursive = options["recursive"]
+    ignore_case = options["ignore_case"]
 
-    path_arg = remaining[1] if len(remaining) == 2 else None
+    remaining = args[index:]
+    patterns = options["patterns"] + _read_pattern_files(
+        options["pattern_files"], shell.cwd
+    )
+    if not options["patterns"] and not options["pattern_files"]:
+        if not remaining:
+            raise CommandError(USAGE)
+        patterns = [remaining[0]]
+        remaining = remaining[1:]
+    if len(remaining) > 1:
+        raise CommandError(USAGE)
+    if not patterns:
+        raise CommandError("grep: no patterns given")
+    pattern_text = _combine_patterns(patterns)
+
+    path_arg = remaining[0] if remaining else None
     display_base = path_arg if path_arg is not None else "."
 
     if path_arg is None:
         if not recursive:
-            raise CommandError("Usage: grep [-r] [-i] <pattern> [path]")
+            raise CommandError(USAGE)
         target = shell.cwd
     else:
-        target = resolve_path(path_arg, shell.cwd)
+        target = resolve_path(path_arg, shell.cwd, shell.fs_cache)
 
     if not target.exists():
         raise CommandError(f"grep: path '{target}' not found")
@@ -57,38 +95,782 @@ def run(args: list[str], shell) -> str:
 
     flags = re.IGNORECASE if ignore_case else 0
     try:
-        pattern = re.compile(pattern_text, flags)
+        pattern = compile_pattern(pattern_text, flags)
     except re.error as error:
         raise CommandError(f"grep: invalid pattern: {error}") from error
 
-    files = _iter_files(target, recursive)
-    matches = []
+    if target.is_file() and target.name.lower().endswith(ARCHIVE_SUFFIXES):
+        options["archives"] = True
+
+    if len(patterns) > 1:
+        options["identify"] = _pattern_identifier(patterns, pattern)
+    if _uses_context(options):
+        options["line_matcher"] = _line_matcher(patterns, pattern)
+    searcher = _build_searcher(
+        patterns, pattern, with_text=options["mode"] == "lines"
+    )
+    files = _iter_files(target, recursive, shell.fs_cache)
+    if recursive and target.is_dir() and not options["archives"]:
+        trigrams = query_trigrams(pattern_text, ignore_case)
+        files = narrow_candidates(files, target, trigrams, shell)
+    return _search(
+        files, searcher, shell, target, display_base, recursive, options
+    )
+
+
+def _parse_options(args: list[str]) -> tuple[dict, int]:
+    """Разбирает ключи grep и возвращает их вместе с индексом шаблона."""
+    options: dict = {
+        "recursive": False,
+        "ignore_case": False,
+        "binary_files": "binary",
+        "archives": False,
+        "mode": "lines",
+        "max_count": None,
+        "patterns": [],
+        "pattern_files": [],
+        "identify": None,
+        "before": 0,
+        "after": 0,
+        "line_matcher": None,
+    }
+    index = 0
+    while (
+        index < len(args)
+        and args[index].startswith("-")
+        and len(args[index]) > 1
+    ):
+        option = args[index][1:]
+        index += 1
+        for position, flag in enumerate(option):
+            if flag in VALUE_FLAGS:
+                value = option[position + 1:]
+                if not value:
+                    if index >= len(args):
+                        raise CommandError(
+                            f"grep: option '-{flag}' requires an argument")
+                    value = args[index]
+                    index += 1
+                _apply_value(options, flag, value)
+                break
+            if flag == "r":
+                options["recursive"] = True
+            elif flag == "i":
+                options["ignore_case"] = True
+            elif flag == "a":
+                options["binary_files"] = "text"
+            elif flag == "I":
+                options["binary_files"] = "without-match"
+            elif flag == "z":
+                options["archives"] = True
+            elif flag in MODE_FLAGS:
+                options["mode"] = MODE_FLAGS[flag]
+            else:
+                raise CommandError(f"grep: unsupported option '-{flag}'")
+    return options, index
+
+
+def _apply_value(options: dict, flag: str, value: str) -> None:
+    """Сохраняет значение ключа, принимающего аргумент."""
+    if flag == "m":
+        options["max_count"] = _parse_count(flag, value)
+    elif flag == "e":
+        options["patterns"].append(value)
+    elif flag == "f":
+        options["pattern_files"].append(value)
+    elif flag == "A":
+        options["after"] = _parse_count(flag, value)
+    elif flag == "B":
+        options["before"] = _parse_count(flag, value)
+    elif flag == "C":
+        options["before"] = options["after"] = _parse_count(flag, value)
 
-    for file_path in files:
+
+def _read_pattern_files(names: list[str], cwd: Path) -> list[str]:
+    """Читает шаблоны из файлов -f, по одному на непустую строку."""
+    patterns: list[str] = []
+    for name in names:
+        path = resolve_path(name, cwd)
         try:
-            for lineno, line in enumerate(
-                file_path.read_text(encoding="utf-8").splitlines(), start=1
+            lines = path.read_text(encoding="utf-8").splitlines()
+        except (OSError, UnicodeDecodeError) as error:
+            raise CommandError(
+                f"grep: cannot read pattern file '{name}': {error}"
+            ) from error
+        patterns.extend(line for line in lines if line)
+    return patterns
+
+
+def _combine_patterns(patterns: list[str]) -> str:
+    """Объединяет шаблоны в одно выражение для поиска за один проход."""
+    if len(patterns) == 1:
+        return patterns[0]
+    if all(_is_literal(text) for text in patterns):
+        return _trie_pattern(patterns)
+    return "|".join(f"(?:{text})" for text in patterns)
+
+
+def _trie_pattern(literals: list[str]) -> str:
+    """Строит из набора строк выражение-префиксное дерево (в духе Ахо—Корасик).
+
+    Общие префиксы разделяются, поэтому движок re проверяет каждую позицию
+    за один спуск по дереву, а не перебирает все альтернативы подряд.
+    Если группы вложены глубже TRIE_MAX_NESTING, что не по силам
+    рекурсивному разбору re, строки просто перечисляются от длинных к коротким.
+    """
+    trie: dict = {}
+    for literal in literals:
+        node = trie
+        for char in literal:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    pattern, nesting = _trie_node_pattern(trie)
+    if nesting > TRIE_MAX_NESTING:
+        ordered = sorted(set(literals), key=len, reverse=True)
+        return "|".join(re.escape(literal) for literal in ordered)
+    return pattern
+
+
+def _trie_node_pattern(root: dict) -> tuple[str, int]:
+    """Превращает префиксное дерево в выражение и глубину вложенности групп.
+
+    Узлы обходятся явным стеком в обратном порядке, поэтому длина строк
+    не упирается в предел рекурсии Python.
+    """
+    built: dict[int, tuple[str, int]] = {}
+    stack: list[tuple[dict, bool]] = [(root, False)]
+    while stack:
+        node, expanded = stack.pop()
+        children = [(char, child) for char, child in sorted(node.items()) if char]
+        if not expanded:
+            stack.append((node, True))
+            stack.extend((child, False) for _, child in children)
+            continue
+        parts = [(char, built.pop(id(child))) for char, child in children]
+        if not parts:
+            built[id(node)] = ("", 0)
+            continue
+        branches = [re.escape(char) + pattern for char, (pattern, _) in parts]
+        nesting = max(depth for _, (_, depth) in parts)
+        terminal = "" in node
+        if len(branches) == 1 and not terminal:
+            built[id(node)] = (branches[0], nesting)
+            continue
+        body = "(?:" + "|".join(branches) + ")"
+        built[id(node)] = (body + "?" if terminal else body, nesting + 1)
+    return built[id(root)]
+
+
+def _pattern_identifier(
+    patterns: list[str], combined: re.Pattern
+) -> Callable[[str], str]:
+    """Возвращает функцию, называющую шаблон, который совпал в строке."""
+    ignore_case = bool(combined.flags & re.IGNORECASE)
+    if all(_is_literal(text) for text in patterns):
+        lookup = {
+            (text.lower() if ignore_case else text): text for text in patterns
+        }
+
+        def identify_literal(line: str) -> str:
+            match = combined.search(line)
+            found = match.group() if match else ""
+            key = found.lower() if ignore_case else found
+            return lookup.get(key, found)
+
+        return identify_literal
+
+    compiled = [
+        (text, compile_pattern(text, combined.flags)) for text in patterns
+    ]
+
+    def identify_regex(line: str) -> str:
+        for text, pattern in compiled:
+            if pattern.search(line):
+                return text
+        return ""
+
+    return identify_regex
+
+
+def _parse_count(flag: str, value: str) -> int:
+    """Проверяет, что аргумент ключа — неотрицательное целое число."""
+    try:
+        number = int(value)
+    except ValueError as error:
+        raise CommandError(
+            f"grep: option '-{flag}' expects a number") from error
+    if number < 0:
+        raise CommandError(f"grep: option '-{flag}' must not be negative")
+    return number
+
+
+def _search(
+    files: Iterable[Path],
+    searcher: Searcher,
+    shell,
+    target: Path,
+    display_base: str,
+    recursive: bool,
+    options: dict,
+) -> Iterator[str]:
+    """Лениво сканирует файлы и отдаёт найденные строки по мере появления."""
+    workers = config.GREP_WORKERS if recursive else 1
+    limit = config.GREP_MAX_OUTPUT_LINES
+    emitted = 0
+    scanned = 0
+    total_bytes = 0
+    started = time.perf_counter()
+
+    scan = _scan_archive if options["archives"] else _scan_file
+    mode = options["mode"]
+    results = map_ordered(
+        lambda file_path: scan(file_path, searcher, options),
+        files,
+        workers,
+    )
+    try:
+        for file_path, sections, size in results:
+            scanned += 1
+            total_bytes += size
+            if not sections:
+                continue
+            if mode == "quiet":
+                return
+            display_path = _format_path(
+                file_path, shell.cwd, target, display_base
+            )
+            for member, hits, binary in sections:
+                label = display_path if member is None else (
+                    f"{display_path}:{member}"
+                )
+                if emitted and _uses_context(options) and not binary:
+                    yield "--\n"
+                lines = _format_section(label, hits, binary, options)
+                for line in lines:
+                    if emitted >= limit:
+                        yield f"grep: output truncated after {limit} lines\n"
+                        return
+                    emitted += 1
+                    yield line
+
+        if not emitted:
+            yield "no matches found\n"
+    finally:
+        results.close()
+        if recursive:
+            elapsed = time.perf_counter() - started
+            shell.notify(_format_throughput(scanned, total_bytes, elapsed))
+
+
+def _format_section(
+    label: str, hits: list, binary: bool, options: dict
+) -> Iterable[str]:
+    """Форматирует совпадения одного файла в соответствии с режимом вывода."""
+    mode = options["mode"]
+    identify = options["identify"]
+    if mode == "files":
+        return [f"{label}\n"]
+    if mode == "count":
+        return [f"{label}:{len(hits)}\n"]
+    if binary:
+        return [f"Binary file {label} matches\n"]
+    if _uses_context(options):
+        return _format_context(label, hits, identify)
+    if identify is not None:
+        return (
+            f"{label} {lineno} [{identify(line)}]:{line}\n"
+            for lineno, line in hits
+        )
+    return (f"{label} {lineno}:{line}\n" for lineno, line in hits)
+
+
+def _format_context(
+    label: str,
+    entries: list[ContextLine],
+    identify: Callable[[str], str] | None,
+) -> Iterator[str]:
+    """Печатает совпадения с контекстом, разделяя несмежные группы «--»."""
+    previous = None
+    for lineno, line, is_match in entries:
+        if previous is not None and lineno > previous + 1:
+            yield "--\n"
+        previous = lineno
+        if not is_match:
+            yield f"{label} {lineno}-{line}\n"
+        elif identify is not None:
+            yield f"{label} {lineno} [{identify(line)}]:{line}\n"
+        else:
+            yield f"{label} {lineno}:{line}\n"
+
+
+def _uses_context(options: dict) -> bool:
+    """Проверяет, запрошены ли строки контекста для обычного вывода."""
+    return options["mode"] == "lines" and bool(
+        options["before"] or options["after"]
+    )
+
+
+def _hit_limit(options: dict, binary: bool) -> int:
+    """Возвращает, сколько совпадающих строк нужно найти в одном файле."""
+    mode = options["mode"]
+    if mode in ("files", "quiet"):
+        return 1
+    if mode == "count":
+        limit = sys.maxsize
+    else:
+        limit = 1 if binary else config.GREP_MAX_OUTPUT_LINES + 1
+    if options["max_count"] is not None:
+        limit = min(limit, options["max_count"])
+    return limit
+
+
+def _scan_file(
+    file_path: Path, searcher: Searcher, options: dict
+) -> tuple[Path, list[Section], int]:
+    """Читает файл и возвращает найденные строки и объём прочитанных байт.
+
+    Файлы gzip, bzip2 и xz распознаются по сигнатуре и просматриваются
+    в распакованном виде потоком.
+    """
+    try:
+        with file_path.open("rb") as handle:
+            head = handle.read(config.GREP_BINARY_SNIFF_SIZE)
+            if compression_format(head) is None:
+                return _scan_plain(file_path, handle, head, searcher, options)
+        with open_decompressed(file_path) as stream:
+            hits, size, binary = _scan_stream(stream.read, searcher, options)
+        return file_path, _sections(None, hits, binary), size
+    except Exception as error:
+        logger.error(f"grep: failed to read {file_path}: {error}")
+        return file_path, [], 0
+
+
+def _scan_plain(
+    file_path: Path,
+    handle: IO[bytes],
+    head: bytes,
+    searcher: Searcher,
+    options: dict,
+) -> tuple[Path, list[Section], int]:
+    """Ищет в несжатом файле, начало которого уже прочитано."""
+    if _uses_context(options):
+        handle.seek(0)
+        hits, size, binary = _scan_stream(handle.read, searcher, options)
+        return file_path, _sections(None, hits, binary), size
+
+    binary = options["binary_files"] != "text" and looks_binary(head)
+    if binary and options["binary_files"] == "without-match":
+        return file_path, [], len(head)
+    limit = _hit_limit(options, binary)
+    if not limit:
+        return file_path, [], len(head)
+
+    size = file_path.stat().st_size
+    if size and size >= config.GREP_MMAP_THRESHOLD:
+        mapped = _scan_mapped(handle, searcher, limit)
+        if mapped is not None:
+            return file_path, _sections(None, mapped, binary), size
+    data = head + handle.read()
+    hits = list(islice(searcher(data), limit))
+    return file_path, _sections(None, hits, binary), len(data)
+
+
+def _scan_archive(
+    file_path: Path, searcher: Searcher, options: dict
+) -> tuple[Path, list[Section], int]:
+    """Ищет внутри архива, распаковывая элементы потоком в памяти."""
+    kind = _archive_kind(file_path)
+    if kind is None:
+        return _scan_file(file_path, searcher, options)
+
+    sections: list[Section] = []
+    total = 0
+    try:
+        for member, stream in _archive_members(file_path, kind):
+            with stream:
+                hits, size, binary = _scan_stream(
+                    stream.read, searcher, options
+                )
+            total += size
+            sections.extend(_sections(member, hits, binary))
+    except Exception as error:
+        logger.error(f"grep: failed to read archive {file_path}: {error}")
+    return file_path, sections, total
+
+
+def _archive_kind(file_path: Path) -> str | None:
+    """Определяет формат архива по имени, а затем по содержимому."""
+    name = file_path.name.lower()
+    if name.endswith(".zip"):
+        return "zip"
+    if name.endswith((".tar.gz", ".tgz", ".tar")):
+        return "tar"
+    if name.endswith(".gz"):
+        return "tar" if tarfile.is_tarfile(file_path) else "gz"
+    try:
+        with file_path.open("rb") as handle:
+            magic = handle.read(4)
+    except OSError:
+        return None
+    if magic.startswith(b"PK\x03\x04"):
+        return "zip"
+    if magic.startswith(b"\x1f\x8b"):
+        return "tar" if tarfile.is_tarfile(file_path) else "gz"
+    return None
+
+
+def _archive_members(
+    file_path: Path, kind: str
+) -> Iterator[tuple[str, IO[bytes] | gzip.GzipFile]]:
+    """Перечисляет безопасные элементы архива вместе с потоками чтения."""
+    if kind == "gz":
+        member = file_path.name[:-3] if file_path.name.endswith(".gz") else (
+            file_path.name
+        )
+        yield member, gzip.open(file_path, "rb")
+        return
+
+    if kind == "zip":
+        with zipfile.ZipFile(file_path) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not _safe_member(
+                    info.filename, unzip._should_skip, unzip._validated_path
+                ):
+                    continue
+                yield info.filename, archive.open(info)
+        return
+
+    with tarfile.open(file_path, "r|*") as archive:
+        for entry in archive:
+            if not entry.isfile() or not _safe_member(
+                entry.name, untar._should_skip, untar._validated_member
             ):
-                if pattern.search(line):
-                    display_path = _format_path(
-                        file_path, shell.cwd, target, display_base
-                    )
-                    matches.append(f"{display_path} {lineno}:{line}")
-        except Exception as error:
-            logger.error(f"grep: failed to read {file_path}: {error}")
+                continue
+            stream = archive.extractfile(entry)
+            if stream is not None:
+                yield entry.name, stream
+
+
+def _safe_member(name: str, should_skip, validate) -> bool:
+    """Пропускает служебные и небезопасные пути внутри архива."""
+    if should_skip(name):
+        return False
+    try:
+        validate(name)
+    except CommandError as error:
+        logger.error(f"grep: skipping archive member: {error}")
+        return False
+    return True
+
+
+def _scan_stream(
+    read: Callable[[int], bytes], searcher: Searcher, options: dict
+) -> tuple[Found, int, bool]:
+    """Ищет в потоке блоками, определяя двоичность по первому блоку."""
+    binary_files = options["binary_files"]
+    head = read(config.GREP_BINARY_SNIFF_SIZE)
+    binary = binary_files != "text" and looks_binary(head)
+    if binary and binary_files == "without-match":
+        return [], len(head), True
+    limit = _hit_limit(options, binary)
+    if not limit:
+        return [], len(head), binary
+
+    consumed = len(head)
+
+    def counting_read(size: int) -> bytes:
+        nonlocal consumed
+        block = read(size)
+        consumed += len(block)
+        return block
+
+    if _uses_context(options) and not binary:
+        lines = _iter_lines(counting_read, head)
+        cap = config.GREP_MAX_OUTPUT_LINES + 1
+        entries = list(islice(_context_lines(lines, options), cap))
+        return entries, consumed, False
+
+    hits = list(islice(_stream_hits(counting_read, searcher, head), limit))
+    return hits, consumed, binary
+
+
+def _iter_lines(read: Callable[[int], bytes], pending: bytes) -> Iterator[bytes]:
+    """Разбивает поток на строки, держа в памяти не больше одного блока."""
+    while True:
+        lines = pending.split(b"\n")
+        pending = lines.pop()
+        yield from lines
+        block = read(STREAM_BLOCK)
+        if not block:
+            break
+        pending += block
+    if pending:
+        yield pending
+
+
+def _context_lines(
+    lines: Iterator[bytes], options: dict
+) -> Iterator[ContextLine]:
+    """Отдаёт совпадения и соседние строки, храня предыдущие в кольцевом буфере."""
+    matches = options["line_matcher"]
+    max_count = options["max_count"]
+    previous: deque = deque(maxlen=options["before"])
+    trailing = 0
+    found = 0
+    for lineno, raw in enumerate(lines, start=1):
+        exhausted = max_count is not None and found >= max_count
+        if not exhausted and matches(raw):
+            found += 1
+            for context_lineno, context_raw in previous:
+                yield context_lineno, _decode_line(context_raw), False
+            previous.clear()
+            yield lineno, _decode_line(raw), True
+            trailing = options["after"]
+        elif trailing:
+            trailing -= 1
+            yield lineno, _decode_line(raw), False
+        elif exhausted:
+            break
+        else:
+            previous.append((lineno, raw))
+
+
+def _line_matcher(
+    patterns: list[str], pattern: re.Pattern
+) -> Callable[[bytes], bool]:
+    """Возвращает проверку одной сырой строки на совпадение."""
+    ignore_case = bool(pattern.flags & re.IGNORECASE)
+    if len(patterns) == 1 and not ignore_case and _is_literal(patterns[0]):
+        needle = patterns[0].encode("utf-8")
+        return lambda raw: needle in raw
+    return lambda raw: pattern.search(_decode_line(raw)) is not None
+
+
+def _decode_line(raw: bytes) -> str:
+    """Декодирует строку, отбрасывая завершающий возврат каретки."""
+    line = raw.decode("utf-8", errors="replace")
+    return line[:-1] if line.endswith("\r") else line
+
+
+def _sections(
+    member: str | None, hits: Found, binary: bool
+) -> list[Section]:
+    """Оборачивает найденные строки в секцию вывода, если они есть."""
+    return [(member, hits, binary)] if hits else []
+
+
+def _scan_mapped(handle, searcher: Searcher, limit: int) -> list[Hit] | None:
+    """Ищет по отображённому в память файлу окнами, не читая его целиком."""
+    if not has_os_descriptor(handle):
+        return None
+    with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if hasattr(mapped, "madvise"):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        return list(islice(_stream_hits(mapped.read, searcher), limit))
+
+
+def _stream_hits(
+    read: Callable[[int], bytes], searcher: Searcher, pending: bytes = b""
+) -> Iterator[Hit]:
+    """Прогоняет поиск по блокам потока, выровненным по концам строк."""
+    window = config.GREP_MMAP_WINDOW
+    base_lineno = 0
+    while True:
+        block = read(window)
+        if not block:
+            break
+        data = pending + block
+        cut = data.rfind(b"\n") + 1
+        if not cut:
+            pending = data
+            continue
+        chunk, pending = data[:cut], data[cut:]
+        for lineno, line in searcher(chunk):
+            yield base_lineno + lineno, line
+        base_lineno += chunk.count(b"\n")
+    if pending:
+        for lineno, line in searcher(pending):
+            yield base_lineno + lineno, line
+
+
+def _build_searcher(
+    patterns: list[str], pattern: re.Pattern, with_text: bool = True
+) -> Searcher:
+    """Выбирает самый дешёвый способ поиска для данного набора шаблонов.
+
+    Без ``with_text`` литеральные поиски не считают номера строк и не
+    декодируют их текст — это нужно режимам -l, -c и -q.
+    """
+    ignore_case = bool(pattern.flags & re.IGNORECASE)
+    if all(_is_literal(text) for text in patterns):
+        ascii_only = all(text.isascii() for text in patterns)
+        if len(patterns) > 1:
+            if not ignore_case or ascii_only:
+                return _literal_set_searcher(
+                    compile_pattern(
+                        pattern.pattern.encode("utf-8"),
+                        pattern.flags & re.IGNORECASE,
+                    ),
+                    with_text,
+                )
+        elif not ignore_case:
+            return _literal_searcher(patterns[0].encode("utf-8"), with_text)
+        elif ascii_only:
+            return _folded_literal_searcher(
+                patterns[0].lower().encode("utf-8"), with_text)
+
+    if any(construct in pattern.pattern for construct in LINE_ONLY_CONSTRUCTS):
+        return _line_searcher(pattern)
+    return _regex_searcher(pattern)
+
+
+def _is_literal(pattern_text: str) -> bool:
+    """Проверяет, что шаблон не содержит метасимволов регулярных выражений."""
+    return not any(char in REGEX_METACHARACTERS for char in pattern_text)
+
+
+def _literal_searcher(needle: bytes, with_text: bool) -> Searcher:
+    """Ищет подстроку прямо в байтах файла без декодирования."""
+
+    def search(data: bytes) -> Iterator[Hit]:
+        return _buffer_hits(
+            data, lambda pos: data.find(needle, pos), b"\n",
+            with_text=with_text)
+
+    return search
+
+
+def _folded_literal_searcher(needle: bytes, with_text: bool) -> Searcher:
+    """Ищет ASCII-подстроку без учёта регистра по приведённой копии буфера."""
+
+    def search(data: bytes) -> Iterator[Hit]:
+        lowered = data.lower()
+        return _buffer_hits(
+            data, lambda pos: lowered.find(needle, pos), b"\n",
+            with_text=with_text)
+
+    return search
+
+
+def _literal_set_searcher(
+    automaton: re.Pattern, with_text: bool
+) -> Searcher:
+    """Ищет сразу весь набор строк по байтам через префиксное дерево."""
+
+    def search(data: bytes) -> Iterator[Hit]:
+        def find(pos: int) -> int:
+            match = automaton.search(data, pos)
+            return match.start() if match else -1
+
+        return _buffer_hits(data, find, b"\n", with_text=with_text)
+
+    return search
+
+
+def _regex_searcher(pattern: re.Pattern) -> Searcher:
+    """Прогоняет регулярное выражение по всему тексту файла целиком.
+
+    Переводы строк CRLF сводятся к LF, иначе ``$`` в режиме MULTILINE не
+    совпадёт перед ``\r\n``; номера строк при этом не меняются.
+    """
+    multiline = compile_pattern(
+        pattern.pattern, pattern.flags | re.MULTILINE)
+
+    def search(data: bytes) -> Iterator[Hit]:
+        text = data.decode("utf-8", errors="replace")
+        if "\r\n" in text:
+            text = text.replace("\r\n", "\n")
+
+        def find(pos: int) -> int:
+            match = multiline.search(text, pos)
+            return match.start() if match else -1
+
+        return _buffer_hits(text, find, "\n", verify=pattern.search)
+
+    return search
+
+
+def _line_searcher(pattern: re.Pattern) -> Searcher:
+    """Проверяет шаблон построчно для конструкций, зависящих от границ строки.
+
+    Строки делятся только по ``\n``, как и в остальных способах поиска,
+    чтобы номера строк не зависели от выбранного способа.
+    """
+
+    def search(data: bytes) -> Iterator[Hit]:
+        lines = data.split(b"\n")
+        if lines[-1] == b"":
+            lines.pop()
+        for lineno, raw in enumerate(lines, start=1):
+            line = _decode_line(raw)
+            if pattern.search(line):
+                yield lineno, line
+
+    return search
+
+
+def _buffer_hits(
+    buffer,
+    find: Callable[[int], int],
+    newline,
+    verify: Callable[[str], object] | None = None,
+    with_text: bool = True,
+) -> Iterator[Hit]:
+    """Определяет номера и текст строк только вокруг найденных смещений."""
+    size = len(buffer)
+    pos = 0
+    lineno = 1
+    counted = 0
+    while pos <= size:
+        start = find(pos)
+        if start < 0:
+            break
+        line_start = buffer.rfind(newline, 0, start) + 1
+        if line_start >= size:
+            break
+        line_end = buffer.find(newline, start)
+        if line_end < 0:
+            line_end = size
+        if not with_text and verify is None:
+            yield NO_TEXT
+            pos = line_end + 1
+            continue
+        lineno += buffer.count(newline, counted, line_start)
+        counted = line_start
+
+        line = buffer[line_start:line_end]
+        if isinstance(line, bytes):
+            line = _decode_line(line)
+        elif line.endswith("\r"):
+            line = line[:-1]
+        if verify is None or verify(line):
+            yield lineno, line
+        pos = line_end + 1
+
 
-    if not matches:
-        return "no matches found"
-    return "\n".join(matches)
+def _format_throughput(files: int, size: int, elapsed: float) -> str:
+    """Формирует строку о пропускной способности поиска."""
+    megabytes = size / (1024 * 1024)
+    seconds = max(elapsed, 1e-9)
+    return (
+        f"grep: scanned {files} files ({megabytes:.2f} MB) in {elapsed:.3f}s"
+        f" — {files / seconds:.1f} files/s, {megabytes / seconds:.2f} MB/s"
+    )
 
 
-def _iter_files(path: Path, recursive: bool) -> list[Path]:
-    """Возвращает список файлов для поиска."""
+def _iter_files(path: Path, recursive: bool,
+                cache: MetadataCache | None = None) -> Iterator[Path]:
+    """Лениво перечисляет файлы для поиска, пропуская служебные каталоги."""
     if path.is_file():
-        return [path]
+        return iter([path])
     if not recursive:
         raise CommandError("grep: -r is required when target is a directory")
-    return [p for p in path.rglob("*") if p.is_file()]
+    return (
+        Path(entry.path)
+        for entry in walk_tree(
+            path, ignore_file=config.IGNORE_FILE, cache=cache)
+        if entry.is_file()
+    )
 
 
 def _format_path(
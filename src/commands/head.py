@@ -0,0 +1,97 @@
+import logging
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+from src import config
+
+from .utils import (
+    CommandError,
+    decode_chunks,
+    open_decompressed,
+    read_chunks,
+    resolve_path,
+)
+
+logger = logging.getLogger("shell")
+
+USAGE = "Usage: head [-n N] <file>"
+DEFAULT_LINES = 10
+
+
+def run(args: list[str], shell) -> Iterator[str]:
+    """Выводит первые N строк файла, не читая его дальше."""
+    count, positional, _flags = parse_line_count(args, USAGE, "head")
+    if len(positional) != 1:
+        raise CommandError(USAGE)
+
+    file_path = resolve_path(positional[0], shell.cwd, shell.fs_cache)
+    if not shell.fs_cache.exists(file_path):
+        raise CommandError(f"head: '{file_path}' not found")
+    if shell.fs_cache.is_dir(file_path):
+        raise CommandError("head: target must be a file")
+
+    logger.debug("head -n %s %s", count, file_path)
+    return _iter_head(file_path, count)
+
+
+def parse_line_count(
+    args: list[str],
+    usage: str,
+    name: str,
+    flags: frozenset[str] = frozenset(),
+) -> tuple[int, list[str], set[str]]:
+    """Разбирает -n N (или -nN) и разрешённые флаги, возвращая их и аргументы."""
+    count = DEFAULT_LINES
+    positional: list[str] = []
+    present: set[str] = set()
+    position = 0
+    while position < len(args):
+        arg = args[position]
+        position += 1
+        if arg in flags:
+            present.add(arg)
+            continue
+        if arg == "-n":
+            if position >= len(args):
+                raise CommandError(usage)
+            value = args[position]
+            position += 1
+        elif arg.startswith("-n"):
+            value = arg[2:]
+        elif arg.startswith("-") and len(arg) > 1:
+            raise CommandError(f"{name}: unsupported option '{arg}'")
+        else:
+            positional.append(arg)
+            continue
+        try:
+            count = int(value)
+        except ValueError as error:
+            raise CommandError(
+                f"{name}: -n requires a non-negative integer") from error
+        if count < 0:
+            raise CommandError(f"{name}: -n requires a non-negative integer")
+    return count, positional, present
+
+
+def _iter_head(file_path: Path, count: int) -> Iterator[str]:
+    """Отдаёт текст первых строк файла."""
+    with open_decompressed(file_path) as handle:
+        yield from decode_chunks(_head_chunks(handle, count))
+
+
+def _head_chunks(handle: BinaryIO, count: int) -> Iterator[bytes]:
+    """Читает блоки до N-го перевода строки и обрезает последний из них."""
+    if count == 0:
+        return
+    remaining = count
+    for chunk in read_chunks(handle, config.CAT_CHUNK_SIZE):
+        found = chunk.count(b"\n")
+        if found < remaining:
+            remaining -= found
+            yield chunk
+            continue
+        end = -1
+        for _ in range(remaining):
+            end = chunk.index(b"\n", end + 1)
+        yield chunk[:end + 1]
+        return
@@ -0,0 +1,465 @@
+import hashlib
+import json
+import logging
+import os
+import struct
+import time
+import unicodedata
+from array import array
+from collections import defaultdict
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator
+
+from src import config
+
+from .utils import (
+    COMPRESSION_SNIFF_SIZE,
+    CommandError,
+    compression_format,
+    looks_binary,
+    resolve_path,
+    walk_tree,
+)
+
+logger = logging.getLogger("shell")
+
+INDEX_VERSION = 2
+POSTINGS_MAGIC = b"TRGM"
+POSTINGS_HEADER = struct.Struct("<4sQI")
+POSTING_RECORD = struct.Struct("<3sxQI")
+POSTING_ID_TYPE = "I"
+POSTING_ID_SIZE = array(POSTING_ID_TYPE).itemsize
+REGEX_METACHARACTERS = frozenset(".^$*+?{}[]\\|()")
+CHARACTER_ESCAPES = {
+    "a": "\a", "f": "\f", "n": "\n", "r": "\r", "t": "\t", "v": "\v",
+}
+HEX_ESCAPE_DIGITS = {"x": 2, "u": 4, "U": 8}
+
+
+def run(args: list[str], shell) -> str:
+    """Строит или обновляет триграммный индекс каталога для grep -r."""
+    if len(args) > 1:
+        raise CommandError("Usage: index [path]")
+
+    root = resolve_path(args[0], shell.cwd) if args else shell.cwd
+    if not root.exists():
+        raise CommandError(f"index: path '{root}' not found")
+    if not root.is_dir():
+        raise CommandError("index: target must be a directory")
+
+    state = load_index(root)
+    postings = load_postings(state) if state is not None else None
+    if state is None or postings is None:
+        state, postings = _empty_index(root), {}
+    entries = state["files"]
+    fresh: dict[str, list] = {}
+    seen: set[str] = set()
+
+    for file_path in _iter_files(root):
+        relative = file_path.relative_to(root).as_posix()
+        seen.add(relative)
+        stats = file_path.stat()
+        entry = entries.get(relative)
+        if entry is not None and entry[:2] == [stats.st_mtime_ns, stats.st_size]:
+            continue
+        fresh[relative] = [
+            stats.st_mtime_ns,
+            stats.st_size,
+            _file_trigrams(file_path, stats.st_size),
+        ]
+
+    removed = [name for name in entries if name not in seen]
+    if fresh or removed or not index_file_for(root).exists():
+        state["files"], postings = _rebuild(entries, postings, fresh, seen)
+        save_index(state, postings)
+    logger.debug(
+        "index %s: %s files, %s updated", root, len(state["files"]), len(fresh))
+    return (
+        f"Indexed '{root}': {len(state['files'])} files "
+        f"({len(fresh)} updated, {len(removed)} removed)"
+    )
+
+
+def index_file_for(root: Path) -> Path:
+    """Возвращает путь к файлу индекса для каталога."""
+    digest = hashlib.sha1(str(root).encode("utf-8")).hexdigest()[:16]
+    return Path(config.INDEX_DIR) / f"{digest}.json"
+
+
+def postings_file_for(root: Path) -> Path:
+    """Возвращает путь к файлу постингов (триграмма → номера файлов)."""
+    return index_file_for(root).with_suffix(".postings")
+
+
+def load_index(root: Path) -> dict | None:
+    """Загружает индекс каталога, если он существует и совместим."""
+    index_path = index_file_for(root)
+    if not index_path.exists():
+        return None
+    try:
+        state = json.loads(index_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as error:
+        logger.error(f"index: failed to load {index_path}: {error}")
+        return None
+    if state.get("version") != INDEX_VERSION or state.get("root") != str(root):
+        return None
+    return state
+
+
+def load_postings(state: dict) -> dict[bytes, list[int]] | None:
+    """Читает все постинги индекса; None, если файл потерян или устарел."""
+    postings_path = postings_file_for(Path(state["root"]))
+    try:
+        with open(postings_path, "rb") as handle:
+            count = _read_header(handle, state)
+            if count is None:
+                return None
+            directory = handle.read(count * POSTING_RECORD.size)
+            return {
+                trigram: _read_ids(handle, offset, length).tolist()
+                for trigram, offset, length
+                in POSTING_RECORD.iter_unpack(directory)
+            }
+    except (OSError, struct.error) as error:
+        logger.error(f"index: failed to read {postings_path}: {error}")
+        return None
+
+
+def save_index(state: dict, postings: dict[bytes, list[int]]) -> None:
+    """Атомарно записывает индекс на диск.
+
+    Сначала пишется файл постингов, затем JSON с тем же поколением:
+    читатель, заставший их вперемешку, увидит несовпадение и обойдётся
+    без индекса.
+    """
+    root = Path(state["root"])
+    state["generation"] = time.time_ns()
+    keys = sorted(postings)
+    offset = POSTINGS_HEADER.size + len(keys) * POSTING_RECORD.size
+    directory = bytearray()
+    for trigram in keys:
+        directory += POSTING_RECORD.pack(trigram, offset, len(postings[trigram]))
+        offset += len(postings[trigram]) * POSTING_ID_SIZE
+
+    postings_path = postings_file_for(root)
+    postings_path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = postings_path.with_suffix(".postings.tmp")
+    with open(temporary, "wb") as handle:
+        handle.write(POSTINGS_HEADER.pack(
+            POSTINGS_MAGIC, state["generation"], len(keys)))
+        handle.write(directory)
+        for trigram in keys:
+            handle.write(array(POSTING_ID_TYPE, postings[trigram]).tobytes())
+    os.replace(temporary, postings_path)
+
+    index_path = index_file_for(root)
+    temporary = index_path.with_suffix(".tmp")
+    temporary.write_text(json.dumps(state), encoding="utf-8")
+    os.replace(temporary, index_path)
+
+
+def find_index(path: Path) -> dict | None:
+    """Ищет индекс для каталога или ближайшего проиндексированного предка."""
+    for candidate in (path, *path.parents):
+        state = load_index(candidate)
+        if state is not None:
+            return state
+    return None
+
+
+def narrow_candidates(
+    files: Iterable[Path],
+    target: Path,
+    trigrams: list[bytes],
+    shell,
+) -> Iterator[Path]:
+    """Отбрасывает файлы, в которых по индексу заведомо нет совпадений.
+
+    Из файла постингов читаются только списки триграмм запроса.
+    Файлы, изменённые после последнего index, остаются кандидатами.
+    """
+    state = find_index(target) if trigrams else None
+    matching = _matching_ids(state, trigrams) if state is not None else None
+    if state is None or matching is None:
+        yield from files
+        return
+
+    root = Path(state["root"])
+    entries = state["files"]
+    total = 0
+    candidates = 0
+    try:
+        for file_path in files:
+            total += 1
+            entry = entries.get(file_path.relative_to(root).as_posix())
+            if entry is not None and entry[2] is not None \
+                    and entry[2] not in matching:
+                try:
+                    stats = file_path.stat()
+                except OSError:
+                    stats = None
+                if stats is not None and \
+                        entry[:2] == [stats.st_mtime_ns, stats.st_size]:
+                    continue
+            candidates += 1
+            yield file_path
+    finally:
+        shell.notify(
+            f"grep: index narrowed search to {candidates} of {total} files"
+        )
+
+
+def query_trigrams(pattern_text: str, ignore_case: bool) -> list[bytes]:
+    """Возвращает триграммы, обязательные для любого совпадения шаблона."""
+    trigrams: set[bytes] = set()
+    for run_text in _required_literals(pattern_text):
+        if ignore_case and not run_text.isascii():
+            continue
+        data = run_text.encode("utf-8").lower()
+        trigrams.update(data[pos:pos + 3] for pos in range(len(data) - 2))
+    return sorted(trigrams)
+
+
+def _required_literals(pattern_text: str) -> list[str]:
+    """Выделяет литеральные фрагменты, без которых шаблон не совпадёт."""
+    if "|" in pattern_text or "(?" in pattern_text:
+        return []
+
+    runs: list[str] = []
+    current: list[str] = []
+    depth = 0
+    position = 0
+
+    def close(keep_last: bool = True) -> None:
+        if not keep_last and current:
+            current.pop()
+        if depth == 0 and current:
+            runs.append("".join(current))
+        current.clear()
+
+    while position < len(pattern_text):
+        char = pattern_text[position]
+        position += 1
+        if char == "\\" and position < len(pattern_text):
+            decoded, position = _decode_escape(pattern_text, position)
+            if decoded is None:
+                close()
+            else:
+                current.append(decoded)
+        elif char == "[":
+            close()
+            position = _class_end(pattern_text, position)
+        elif char in "?*":
+            close(keep_last=False)
+        elif char == "{":
+            close(keep_last=False)
+            closing = pattern_text.find("}", position)
+            position = len(pattern_text) if closing < 0 else closing + 1
+        elif char == "+":
+            close()
+        elif char == "(":
+            close()
+            depth += 1
+        elif char == ")":
+            close()
+            depth = max(depth - 1, 0)
+        elif char in REGEX_METACHARACTERS:
+            close()
+        else:
+            current.append(char)
+    close()
+    return [run_text for run_text in runs if len(run_text) >= 3]
+
+
+def _class_end(pattern_text: str, position: int) -> int:
+    """Возвращает позицию за «]», закрывающей символьный класс.
+
+    ``position`` указывает сразу за «[». Экранированные символы и «]» в
+    начале класса (в том числе после «^») класс не закрывают.
+    """
+    if pattern_text.startswith("^", position):
+        position += 1
+    if pattern_text.startswith("]", position):
+        position += 1
+    while position < len(pattern_text):
+        char = pattern_text[position]
+        if char == "\\":
+            position += 2
+            continue
+        if char == "]":
+            return position + 1
+        position += 1
+    return len(pattern_text)
+
+
+def _decode_escape(pattern_text: str, position: int) -> tuple[str | None, int]:
+    """Раскодирует экранированную последовательность шаблона.
+
+    Возвращает соответствующий ей символ и позицию за ней. None означает
+    класс, якорь или обратную ссылку — литерал на этом прерывается.
+    """
+    escaped = pattern_text[position]
+    position += 1
+    if escaped in CHARACTER_ESCAPES:
+        return CHARACTER_ESCAPES[escaped], position
+    if escaped in HEX_ESCAPE_DIGITS:
+        end = position + HEX_ESCAPE_DIGITS[escaped]
+        try:
+            return chr(int(pattern_text[position:end], 16)), end
+        except ValueError:
+            return None, end
+    if escaped == "N" and pattern_text.startswith("{", position):
+        closing = pattern_text.find("}", position)
+        if closing < 0:
+            return None, len(pattern_text)
+        name = pattern_text[position + 1:closing]
+        try:
+            return unicodedata.lookup(name), closing + 1
+        except KeyError:
+            return None, closing + 1
+    if escaped.isascii() and escaped.isalnum():
+        while escaped.isdigit() and position < len(pattern_text) \
+                and pattern_text[position].isdigit():
+            position += 1
+        return None, position
+    return escaped, position
+
+
+def _empty_index(root: Path) -> dict:
+    """Создаёт пустую структуру индекса."""
+    return {"version": INDEX_VERSION, "root": str(root), "generation": 0,
+            "files": {}}
+
+
+def _rebuild(
+    entries: dict,
+    postings: dict[bytes, list[int]],
+    fresh: dict[str, list],
+    seen: set[str],
+) -> tuple[dict, dict[bytes, list[int]]]:
+    """Собирает новые записи и постинги, перенумеровывая файлы подряд.
+
+    Неизменившиеся файлы сохраняют свои триграммы из старых постингов,
+    переиндексированные добавляются заново, удалённые выпадают.
+    """
+    files: dict = {}
+    renumbered: dict[int, int] = {}
+    for relative, (mtime_ns, size, file_id) in entries.items():
+        if relative in fresh or relative not in seen:
+            continue
+        if file_id is not None:
+            renumbered[file_id] = len(renumbered)
+            file_id = renumbered[file_id]
+        files[relative] = [mtime_ns, size, file_id]
+
+    rebuilt: defaultdict[bytes, list[int]] = defaultdict(list)
+    for trigram, ids in postings.items():
+        kept = [renumbered[old] for old in ids if old in renumbered]
+        if kept:
+            rebuilt[trigram] = kept
+    next_id = len(renumbered)
+    for relative, (mtime_ns, size, trigrams) in fresh.items():
+        if trigrams is None:
+            files[relative] = [mtime_ns, size, None]
+            continue
+        files[relative] = [mtime_ns, size, next_id]
+        for trigram in trigrams:
+            rebuilt[trigram].append(next_id)
+        next_id += 1
+    return files, rebuilt
+
+
+def _file_trigrams(file_path: Path, size: int) -> set[bytes] | None:
+    """Возвращает набор триграмм файла.
+
+    None означает «кандидат всегда»: так помечаются большие, двоичные
+    и сжатые файлы — в последних grep ищет по распакованному тексту.
+    """
+    if size > config.INDEX_MAX_FILE_SIZE:
+        return None
+    try:
+        data = file_path.read_bytes()
+    except OSError as error:
+        logger.error(f"index: failed to read {file_path}: {error}")
+        return None
+    if compression_format(data[:COMPRESSION_SNIFF_SIZE]) is not None \
+            or looks_binary(data[:config.GREP_BINARY_SNIFF_SIZE]):
+        return None
+    data = data.lower()
+    return {data[pos:pos + 3] for pos in range(len(data) - 2)}
+
+
+def _matching_ids(state: dict, trigrams: list[bytes]) -> set[int] | None:
+    """Пересекает постинги триграмм запроса, начиная с самых коротких.
+
+    Возвращает номера файлов, где есть все триграммы, или None, если
+    файл постингов недоступен или не совпадает с индексом.
+    """
+    postings_path = postings_file_for(Path(state["root"]))
+    try:
+        with open(postings_path, "rb") as handle:
+            count = _read_header(handle, state)
+            if count is None:
+                return None
+            found: list[tuple[int, int]] = []
+            for trigram in trigrams:
+                posting = _find_posting(handle, count, trigram)
+                if posting is None:
+                    return set()
+                found.append(posting)
+            matching: set[int] | None = None
+            for offset, length in sorted(found, key=lambda posting: posting[1]):
+                ids = _read_ids(handle, offset, length)
+                matching = set(ids) if matching is None \
+                    else matching.intersection(ids)
+                if not matching:
+                    break
+            return matching or set()
+    except (OSError, struct.error) as error:
+        logger.error(f"index: failed to read {postings_path}: {error}")
+        return None
+
+
+def _read_header(handle: BinaryIO, state: dict) -> int | None:
+    """Проверяет заголовок файла постингов и возвращает число триграмм."""
+    magic, generation, count = POSTINGS_HEADER.unpack(
+        handle.read(POSTINGS_HEADER.size))
+    if magic != POSTINGS_MAGIC or generation != state.get("generation"):
+        return None
+    return count
+
+
+def _find_posting(
+    handle: BinaryIO, count: int, trigram: bytes
+) -> tuple[int, int] | None:
+    """Двоичным поиском по каталогу находит смещение и длину постинга."""
+    low, high = 0, count
+    while low < high:
+        middle = (low + high) // 2
+        handle.seek(POSTINGS_HEADER.size + middle * POSTING_RECORD.size)
+        key, offset, length = POSTING_RECORD.unpack(
+            handle.read(POSTING_RECORD.size))
+        if key < trigram:
+            low = middle + 1
+        elif key > trigram:
+            high = middle
+        else:
+            return offset, length
+    return None
+
+
+def _read_ids(handle: BinaryIO, offset: int, length: int) -> array:
+    """Читает список номеров файлов одного постинга."""
+    ids = array(POSTING_ID_TYPE)
+    handle.seek(offset)
+    ids.frombytes(handle.read(length * POSTING_ID_SIZE))
+    return ids
+
+
+def _iter_files(root: Path) -> Iterator[Path]:
+    """Перечисляет файлы каталога так же, как их обходит grep -r."""
+    return (
+        Path(entry.path)
+        for entry in walk_tree(root, ignore_file=config.IGNORE_FILE)
+        if entry.is_file()
+    )
@@ -1,115 +1,369 @@
+import heapq
 import logging
 import os
 import stat
-from datetime import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, islice
 from pathlib import Path
+from typing import Callable, Iterable, Iterator
 
-from .utils import CommandError, resolve_path
+from src import config
+
+from .utils import CommandError, map_ordered, resolve_path
 
 logger = logging.getLogger("shell")
 
+MONTH_NAMES = (
+    "янв.",
+    "фев.",
+    "мар.",
+    "апр.",
+    "май",
+    "июн.",
+    "июл.",
+    "авг.",
+    "сент.",
+    "окт.",
+    "нояб.",
+    "дек.",
+)
 
-def run(args: list[str], shell) -> str:
-    """Выводит содержимое каталога и/или сведения о файлах."""
-    long_format = False
-    targets: list[str] = []
+SHORT_FLAGS = frozenset("lRStr")
+USAGE = "Usage: ls [-l] [-R] [-S|-t] [-r] [--top N] [path...]"
 
-    for arg in args:
-        if arg == "-l":
-            long_format = True
-        elif arg.startswith("-"):
-            raise CommandError(f"ls: unsupported option '{arg}'")
-        else:
-            targets.append(arg)
+LongFormatter = Callable[[os.stat_result, str, str], str]
+Listed = tuple[os.DirEntry, os.stat_result | None]
+
+SortKey = tuple[int, str]
+
+
+def _listed_stats(item: Listed) -> os.stat_result:
+    """Возвращает lstat элемента для сортировок, которые без него невозможны."""
+    stats = item[1]
+    assert stats is not None, "size and time sorts always collect lstat"
+    return stats
+
+
+SORT_KEYS: dict[str, Callable[[Listed], SortKey]] = {
+    "name": lambda item: (0, item[0].name.casefold()),
+    "size": lambda item: (
+        -_listed_stats(item).st_size, item[0].name.casefold()),
+    "time": lambda item: (
+        -_listed_stats(item).st_mtime_ns, item[0].name.casefold()),
+}
+
+
+def run(args: list[str], shell) -> str | Iterator[str]:
+    """Выводит содержимое каталога и/или сведения о файлах."""
+    options, targets = _parse_options(args)
 
     if not targets:
         resolved = [shell.cwd]
         display = ["."]
     else:
-        resolved = [resolve_path(item, shell.cwd) for item in targets]
+        resolved = [
+            resolve_path(item, shell.cwd, shell.fs_cache) for item in targets
+        ]
         display = targets
 
-    sections: list[str] = []
-    multiple = len(resolved) > 1
-
+    checked: list[tuple[str, Path, os.stat_result]] = []
     for index, path in enumerate(resolved):
         raw_name = display[index]
-        if not path.exists() and not path.is_symlink():
+        try:
+            checked.append((raw_name, path, os.lstat(path)))
+        except FileNotFoundError as error:
             raise CommandError(
-                f"ls: cannot access '{raw_name}': No such file or directory")
+                f"ls: cannot access '{raw_name}': No such file or directory"
+            ) from error
 
-        if path.is_dir():
-            listing = _list_directory(path, long_format)
+    if options["long"]:
+        options["format_long"] = _long_formatter()
+    options["named"] = bool(targets)
+    options["cache"] = shell.fs_cache
+    logger.debug("ls executed with args: %s", args)
+    if options["recursive"]:
+        return _iter_recursive(checked, options, shell)
+
+    sections: list[str] = []
+    multiple = len(resolved) > 1
+
+    for raw_name, path, stats in checked:
+        if _is_directory(path, stats):
+            listing = _list_directory(path, options)
             if multiple:
                 header = raw_name if raw_name != "." else str(path)
                 sections.append(f"{header}:\n{listing}" if listing else f"{header}:")
             else:
                 sections.append(listing)
         else:
-            name = raw_name if targets else path.name
-            sections.append(_format_entry(path, long_format, name))
+            sections.append(_format_target(raw_name, path, stats, options))
 
-    result = "\n\n".join(part for part in sections if part is not None)
-    logger.debug("ls executed with args: %s", args)
-    return result
+    return "\n\n".join(part for part in sections if part is not None)
+
+
+def _parse_options(args: list[str]) -> tuple[dict, list[str]]:
+    """Разбирает ключи ls и возвращает их вместе со списком целей."""
+    options = {
+        "long": False,
+        "recursive": False,
+        "sort": "name",
+        "reverse": False,
+        "top": None,
+        "format_long": None,
+        "named": False,
+        "cache": None,
+    }
+    targets: list[str] = []
+    position = 0
 
+    while position < len(args):
+        arg = args[position]
+        position += 1
+        if arg == "--top" or arg.startswith("--top="):
+            if arg == "--top":
+                if position >= len(args):
+                    raise CommandError(USAGE)
+                value = args[position]
+                position += 1
+            else:
+                value = arg.partition("=")[2]
+            options["top"] = _parse_top(value)
+        elif arg.startswith("-"):
+            flags = arg[1:]
+            if not flags or any(flag not in SHORT_FLAGS for flag in flags):
+                raise CommandError(f"ls: unsupported option '{arg}'")
+            for flag in flags:
+                if flag == "l":
+                    options["long"] = True
+                elif flag == "R":
+                    options["recursive"] = True
+                elif flag == "S":
+                    options["sort"] = "size"
+                elif flag == "t":
+                    options["sort"] = "time"
+                elif flag == "r":
+                    options["reverse"] = True
+        else:
+            targets.append(arg)
 
-def _list_directory(path: Path, long_format: bool) -> str:
-    """Формирует вывод по содержимому каталога."""
+    return options, targets
+
+
+def _parse_top(value: str) -> int:
+    """Проверяет, что аргумент --top — положительное целое число."""
     try:
-        entries = sorted(
-            (item for item in path.iterdir() if not item.name.startswith(".")),
-            key=lambda item: item.name.casefold(),
-        )
+        number = int(value)
+    except ValueError as error:
+        raise CommandError(
+            "ls: --top requires a positive integer") from error
+    if number <= 0:
+        raise CommandError("ls: --top requires a positive integer")
+    return number
+
+
+def _format_target(raw_name: str, path: Path, stats: os.stat_result,
+                   options: dict) -> str:
+    """Возвращает строку для файла, переданного аргументом."""
+    name = raw_name if options["named"] else path.name
+    if options["format_long"] is not None:
+        return options["format_long"](stats, name, str(path))
+    return name
+
+
+def _iter_recursive(
+    checked: list[tuple[str, Path, os.stat_result]],
+    options: dict,
+    shell,
+) -> Iterator[str]:
+    """Отдаёт вывод `ls -R` по секциям, не дожидаясь обхода всего дерева."""
+    separator = ""
+    for raw_name, path, stats in checked:
+        if not _is_directory(path, stats):
+            yield separator + _format_target(
+                raw_name, path, stats, options) + "\n"
+            separator = "\n"
+            continue
+        for section in _iter_tree(path, raw_name, options, shell):
+            yield separator + section
+            separator = "\n"
+
+
+def _iter_tree(path: Path, header: str, options: dict,
+               shell) -> Iterator[str]:
+    """Обходит дерево в глубину, читая ближайшие каталоги в пуле потоков.
+
+    Секции выдаются строго в порядке обхода, а чтение и lstat следующих
+    по очереди каталогов идут заранее — это скрывает задержку stat на
+    сетевых и overlay-файловых системах. Без stat-данных хватает
+    одного потока: там остаётся только чтение каталогов.
+    """
+    workers = config.LS_STAT_WORKERS if _needs_stats(options) else 1
+    window = workers * 4
+    stack: list[list] = [[path, header, None]]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        try:
+            while stack:
+                for pending in stack[-window:]:
+                    if pending[2] is None:
+                        pending[2] = pool.submit(
+                            _read_section, pending[0], pending[1], options)
+                path, header, future = stack.pop()
+                try:
+                    text, subdirs = future.result()
+                except CommandError as error:
+                    logger.error(str(error))
+                    shell.notify(str(error))
+                    yield f"{header}:\n"
+                    continue
+                yield text
+                stack.extend(
+                    [Path(entry.path), os.path.join(header, entry.name), None]
+                    for entry in reversed(subdirs)
+                )
+        finally:
+            for pending in stack:
+                if pending[2] is not None:
+                    pending[2].cancel()
+
+
+def _read_section(path: Path, header: str,
+                  options: dict) -> tuple[str, list[os.DirEntry]]:
+    """Читает каталог и возвращает его секцию вывода и подкаталоги."""
+    items = _scan_entries(path, options)
+    listing = _format_entries(items, options)
+    subdirs = [entry for entry, _stats in items
+               if entry.is_dir(follow_symlinks=False)]
+    text = f"{header}:\n{listing}\n" if listing else f"{header}:\n"
+    return text, subdirs
+
+
+def _is_directory(path: Path, stats: os.stat_result) -> bool:
+    """Проверяет, ведёт ли путь в каталог, переходя по символической ссылке."""
+    if stat.S_ISDIR(stats.st_mode):
+        return True
+    if not stat.S_ISLNK(stats.st_mode):
+        return False
+    try:
+        return stat.S_ISDIR(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+
+def _list_directory(path: Path, options: dict) -> str:
+    """Формирует вывод по содержимому каталога за один проход scandir."""
+    return _format_entries(_scan_entries(path, options), options)
+
+
+def _needs_stats(options: dict) -> bool:
+    """Проверяет, нужны ли элементам данные lstat для вывода или сортировки."""
+    return options["long"] or options["sort"] != "name"
+
+
+def _scan_entries(path: Path, options: dict) -> list[Listed]:
+    """Возвращает видимые элементы каталога в запрошенном порядке.
+
+    Каждый элемент получает не больше одного lstat, и тот же результат
+    потом идёт в форматирование `-l`. При --top N выбор идёт через кучу
+    размера N прямо по потоку scandir, без полной сортировки. Когда stat
+    не нужен, листинг берётся из кэша метаданных оболочки.
+    """
+    cache = options["cache"]
+    try:
+        if cache is not None and not _needs_stats(options):
+            return _order(_visible(cache.listing(path), options), options)
+        with os.scandir(path) as iterator:
+            return _order(_visible(iterator, options), options)
     except PermissionError as error:
         raise CommandError(
             f"ls: cannot open directory '{path}': {error}") from error
 
-    formatted = [_format_entry(entry, long_format) for entry in entries]
-    return "\n".join(formatted)
 
+def _visible(entries: Iterable[os.DirEntry], options: dict) -> Iterator[Listed]:
+    """Отбрасывает скрытые элементы и добавляет lstat, если он нужен.
 
-def _format_entry(path: Path, long_format: bool,
-                  display_name: str | None = None) -> str:
-    """Возвращает строку для элемента списка."""
-    name = display_name if display_name is not None else path.name
-    if long_format:
-        return _format_long_entry(path, name)
-    return name
+    Элементы большого каталога делятся на пачки по ``LS_STAT_BATCH``,
+    и пачки получают lstat параллельно в пуле потоков; порядок scandir
+    при этом сохраняется. Каталог из одной пачки обходится без пула.
+    """
+    shown = (entry for entry in entries if not entry.name.startswith("."))
+    if not _needs_stats(options):
+        for entry in shown:
+            yield entry, None
+        return
+    batches = iter(lambda: list(islice(shown, config.LS_STAT_BATCH)), [])
+    first = next(batches, [])
+    second = next(batches, None)
+    if second is None:
+        yield from _stat_batch(first)
+        return
+    for listed in map_ordered(_stat_batch, chain([first, second], batches),
+                              config.LS_STAT_WORKERS):
+        yield from listed
 
 
-def _format_long_entry(path: Path, display_name: str) -> str:
-    """Возвращает подробную строку в стиле `ls -l`."""
-    stats = path.lstat()
-    mode = stat.filemode(stats.st_mode)
-    size = stats.st_size
-    modified = datetime.fromtimestamp(stats.st_mtime)
-    month_names = {
-        1: "янв.",
-        2: "фев.",
-        3: "мар.",
-        4: "апр.",
-        5: "май",
-        6: "июн.",
-        7: "июл.",
-        8: "авг.",
-        9: "сент.",
-        10: "окт.",
-        11: "нояб.",
-        12: "дек.",
-    }
-    month = month_names.get(modified.month, f"{modified.month:02d}")
-    date_text = (
-        f"{modified.day} {month} "
-        f"{modified.hour:02d}:{modified.minute:02d}"
+def _stat_batch(entries: list[os.DirEntry]) -> list[Listed]:
+    """Делает lstat пачки элементов, пропуская уже исчезнувшие."""
+    listed: list[Listed] = []
+    for entry in entries:
+        try:
+            listed.append((entry, entry.stat(follow_symlinks=False)))
+        except FileNotFoundError:
+            continue
+    return listed
+
+
+def _order(items: Iterable[Listed], options: dict) -> list[Listed]:
+    """Сортирует элементы или выбирает первые N по ключу сортировки."""
+    key = SORT_KEYS[options["sort"]]
+    if options["top"] is None:
+        return sorted(items, key=key, reverse=options["reverse"])
+    select = heapq.nlargest if options["reverse"] else heapq.nsmallest
+    return select(options["top"], items, key=key)
+
+
+def _format_entries(items: list[Listed], options: dict) -> str:
+    """Форматирует элементы каталога, используя уже полученные lstat."""
+    format_long = options["format_long"]
+    if format_long is None:
+        return "\n".join(entry.name for entry, _stats in items)
+    return "\n".join(
+        format_long(stats, entry.name, entry.path) for entry, stats in items
     )
 
-    name = display_name
-    if path.is_symlink():
-        try:
-            target = os.readlink(path)
-        except OSError:
-            target = "?"
-        name = f"{display_name} -> {target}"
 
-    return f"{mode} {size:>8} {date_text} {name}"
+def _long_formatter() -> LongFormatter:
+    """Готовит форматирование строк `ls -l`, общее для всего вызова.
+
+    Права и даты запоминаются по значению: в больших каталогах у тысяч
+    файлов совпадают режим доступа и секунда изменения.
+    """
+    modes: dict[int, str] = {}
+    dates: dict[int, str] = {}
+
+    def format_long(stats: os.stat_result, display_name: str,
+                    path: str) -> str:
+        mode = modes.get(stats.st_mode)
+        if mode is None:
+            mode = modes[stats.st_mode] = stat.filemode(stats.st_mode)
+
+        seconds = int(stats.st_mtime)
+        date_text = dates.get(seconds)
+        if date_text is None:
+            moment = time.localtime(seconds)
+            date_text = dates[seconds] = (
+                f"{moment.tm_mday} {MONTH_NAMES[moment.tm_mon - 1]} "
+                f"{moment.tm_hour:02d}:{moment.tm_min:02d}"
+            )
+
+        name = display_name
+        if stat.S_ISLNK(stats.st_mode):
+            try:
+                target = os.readlink(path)
+            except OSError:
+                target = "?"
+            name = f"{display_name} -> {target}"
+
+        return f"{mode} {stats.st_size:>8} {date_text} {name}"
+
+    return format_long
@@ -2,14 +2,15 @@ import logging
 import shutil
 from pathlib import Path
 
-from .utils import CommandError, resolve_path
+from .utils import CommandError, MetadataCache, copy_file, resolve_path
 
 logger = logging.getLogger("shell")
 
 
-def _final_destination(source: Path, destination: Path) -> Path:
+def _final_destination(source: Path, destination: Path,
+                       cache: MetadataCache) -> Path:
     """Определяет фактический путь назначения."""
-    if destination.exists() and destination.is_dir():
+    if cache.is_dir(destination):
         return destination / source.name
     return destination
 
@@ -19,22 +20,25 @@ def run(args: list[str], shell) -> str:
     if len(args) != 2:
         raise CommandError("Usage: mv <source> <destination>")
 
-    source = resolve_path(args[0], shell.cwd)
-    if not source.exists():
+    cache = shell.fs_cache
+    source = resolve_path(args[0], shell.cwd, cache)
+    if not cache.exists(source):
         raise CommandError(f"mv: source '{source}' not found")
 
-    destination_raw = resolve_path(args[1], shell.cwd)
-    destination = _final_destination(source, destination_raw)
+    destination_raw = resolve_path(args[1], shell.cwd, cache)
+    destination = _final_destination(source, destination_raw, cache)
     destination.parent.mkdir(parents=True, exist_ok=True)
 
     if source.resolve() == destination.resolve():
         raise CommandError("mv: source and destination are the same")
 
     try:
-        shutil.move(str(source), str(destination))
+        shutil.move(str(source), str(destination), copy_function=copy_file)
     except Exception as error:
         logger.exception("mv failed: %s", error)
         raise CommandError(f"mv: failed to move: {error}") from error
+    finally:
+        cache.invalidate(source, destination)
 
     shell.push_undo(
         {
@@ -1,24 +1,11 @@
 import logging
-import os
-import shutil
 from pathlib import Path
-from datetime import datetime
 
-from .utils import CommandError, resolve_path
+from .utils import CommandError, move_to_trash, resolve_path
 
 logger = logging.getLogger("shell")
 
 
-def _move_to_trash(path: Path, trash_root: Path) -> Path:
-    """Перемещает объект в корзину и возвращает путь назначения."""
-    trash_root.mkdir(parents=True, exist_ok=True)
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
-    suffix = f"{timestamp}_{os.getpid()}"
-    trash_path = trash_root / f"{path.name}.{suffix}"
-    shutil.move(str(path), str(trash_path))
-    return trash_path
-
-
 def run(args: list[str], shell) -> str:
     """Удаляет файлы или каталоги, перемещая их в корзину."""
     if not args:
@@ -39,27 +26,33 @@ def run(args: list[str], shell) -> str:
         raise CommandError("rm: missing operand")
 
     messages: list[str] = []
+    cache = shell.fs_cache
 
     for raw in targets:
-        path = resolve_path(raw, shell.cwd)
+        path = resolve_path(raw, shell.cwd, cache)
         raw_clean = raw.rstrip("/")
         if path == Path("/"):
             raise CommandError("rm: refusing to remove '/'")
         if raw_clean in {"..", "/.."} or path == shell.cwd.parent:
             raise CommandError("rm: refusing to remove '..'")
-        if not path.exists():
+        if not cache.exists(path):
             raise CommandError(f"rm: '{path}' not found")
-        if path.is_dir() and not recursive:
+        is_dir = cache.is_dir(path)
+        if is_dir and not recursive:
             raise CommandError(f"rm: cannot remove '{path}': is a directory")
 
-        if path.is_dir():
+        if is_dir:
             prompt = f"Remove directory '{path}' recursively? (y/n): "
             answer = input(prompt).strip().lower()
             if answer != "y":
                 logger.debug("rm cancelled for directory %s", path)
                 continue
 
-        trash_path = _move_to_trash(path, shell.trash_dir)
+        try:
+            trash_path = move_to_trash(path, shell.trash_dir)
+        finally:
+            cache.invalidate(path)
+        cache.invalidate(trash_path)
 
         shell.push_undo(
             {
@@ -0,0 +1,27 @@
+from .utils import CommandError, compile_pattern
+
+
+def run(args: list[str], shell) -> str:
+    """Показывает счётчики внутренних кэшей оболочки."""
+    if args:
+        raise CommandError("Usage: stats")
+
+    info = compile_pattern.cache_info()
+    lines = [
+        f"regex cache: {info.hits} hits, {info.misses} misses, "
+        f"{info.currsize}/{info.maxsize} entries"
+    ]
+    for kind, (hits, misses) in shell.fs_cache.hit_rates().items():
+        lines.append(
+            f"metadata cache ({kind}): {hits} hits, {misses} misses, "
+            f"{_hit_rate(hits, misses)} hit rate"
+        )
+    return "\n".join(lines)
+
+
+def _hit_rate(hits: int, misses: int) -> str:
+    """Форматирует долю попаданий в процентах."""
+    total = hits + misses
+    if not total:
+        return "n/a"
+    return f"{hits / total:.0%}"
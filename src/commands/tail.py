@@ -0,0 +1,122 @@
+import logging
+import os
+import time
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+from src import config
+
+from .head import parse_line_count
+from .utils import (
+    CommandError,
+    decode_chunks,
+    read_chunks,
+    resolve_path,
+)
+
+logger = logging.getLogger("shell")
+
+USAGE = "Usage: tail [-n N] [-f] <file>"
+
+
+def run(args: list[str], shell) -> Iterator[str]:
+    """Выводит последние N строк файла, читая его с конца; -f следит за ростом."""
+    count, positional, flags = parse_line_count(
+        args, USAGE, "tail", frozenset({"-f"}))
+    if len(positional) != 1:
+        raise CommandError(USAGE)
+    follow = "-f" in flags
+
+    file_path = resolve_path(positional[0], shell.cwd, shell.fs_cache)
+    if not shell.fs_cache.exists(file_path):
+        raise CommandError(f"tail: '{file_path}' not found")
+    if shell.fs_cache.is_dir(file_path):
+        raise CommandError("tail: target must be a file")
+
+    logger.debug("tail -n %s %s (follow=%s)", count, file_path, follow)
+    return decode_chunks(_tail_chunks(file_path, count, follow))
+
+
+def _tail_chunks(file_path: Path, count: int,
+                 follow: bool) -> Iterator[bytes]:
+    """Отдаёт байты последних строк, а в режиме -f — и дописанные позже."""
+    handle = file_path.open("rb")
+    try:
+        size = os.fstat(handle.fileno()).st_size
+        handle.seek(_tail_offset(handle, size, count))
+        position = handle.tell()
+        for chunk in read_chunks(handle, config.TAIL_BLOCK_SIZE):
+            position += len(chunk)
+            yield chunk
+        if follow:
+            yield from _follow(file_path, handle, position)
+    finally:
+        handle.close()
+
+
+def _tail_offset(handle: BinaryIO, size: int, count: int) -> int:
+    """Ищет начало последних N строк, просматривая файл блоками с конца.
+
+    Завершающий перевод строки не считается разделителем, поэтому
+    «a\\nb\\n» при N=1 даёт «b\\n». Читается столько блоков, сколько
+    нужно, чтобы встретить N переводов строки, а не весь файл.
+    """
+    if count == 0:
+        return size
+    position = size
+    newlines = 0
+    while position > 0:
+        start = max(0, position - config.TAIL_BLOCK_SIZE)
+        handle.seek(start)
+        block = handle.read(position - start)
+        end = len(block)
+        if position == size and block.endswith(b"\n"):
+            end -= 1
+        while True:
+            found = block.rfind(b"\n", 0, end)
+            if found < 0:
+                break
+            newlines += 1
+            if newlines == count:
+                return start + found + 1
+            end = found
+        position = start
+    return 0
+
+
+def _follow(file_path: Path, handle: BinaryIO,
+            position: int) -> Iterator[bytes]:
+    """Ждёт новых данных, опрашивая размер файла с растущим интервалом.
+
+    Между опросами выполняется один stat пути; читаются только
+    дописанные байты. При усечении файла чтение начинается сначала, при
+    ротации (другой inode по тому же пути) файл открывается заново.
+    Ctrl+C завершает слежение, не закрывая оболочку.
+    """
+    delay = config.TAIL_POLL_MIN
+    try:
+        while True:
+            try:
+                stats = os.stat(file_path)
+            except FileNotFoundError:
+                stats = None
+            if stats is not None:
+                if stats.st_ino != os.fstat(handle.fileno()).st_ino:
+                    handle.close()
+                    handle = file_path.open("rb")
+                    position = 0
+                elif stats.st_size < position:
+                    position = 0
+                if stats.st_size > position:
+                    handle.seek(position)
+                    for chunk in read_chunks(handle, config.TAIL_BLOCK_SIZE):
+                        position += len(chunk)
+                        yield chunk
+                    delay = config.TAIL_POLL_MIN
+                    continue
+            time.sleep(delay)
+            delay = min(delay * 2, config.TAIL_POLL_MAX)
+    except KeyboardInterrupt:
+        return
+    finally:
+        handle.close()
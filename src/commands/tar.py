@@ -2,17 +2,11 @@ import logging
 import tarfile
 from pathlib import Path
 
-from .utils import CommandError, resolve_path
+from .utils import CommandError, resolve_path, walk_tree
 
 logger = logging.getLogger("shell")
 
-
-def _filter_member(member: tarfile.TarInfo) -> tarfile.TarInfo | None:
-    """Пропускает служебные каталоги (.git) при архивации."""
-    parts = Path(member.name).parts
-    if any(part == ".git" for part in parts):
-        return None
-    return member
+SKIPPED_DIRS = frozenset({".git"})
 
 
 def run(args: list[str], shell) -> str:
@@ -32,9 +26,17 @@ def run(args: list[str], shell) -> str:
 
     try:
         with tarfile.open(archive_path, "w:gz") as tf:
-            tf.add(source, arcname=source.name, filter=_filter_member)
+            tf.add(source, arcname=source.name, recursive=False)
+            for entry in walk_tree(
+                source, prune=SKIPPED_DIRS, include_dirs=True
+            ):
+                item = Path(entry.path)
+                arcname = Path(source.name) / item.relative_to(source)
+                tf.add(item, arcname=str(arcname), recursive=False)
         logger.debug(f"created tar {archive_path} from {source}")
         return f"Created archive '{archive_path}'"
     except Exception as error:
         logger.exception(f"tar error: {error}")
         raise CommandError(f"tar: error creating archive: {error}")
+    finally:
+        shell.fs_cache.invalidate(archive_path)
@@ -1,8 +1,9 @@
 import logging
+import os
 import shutil
 from pathlib import Path
 
-from .utils import CommandError
+from .utils import CommandError, copy_file
 
 logger = logging.getLogger("shell")
 
@@ -31,10 +32,22 @@ def run(args: list[str], shell) -> str:
     except Exception as error:
         shell.push_undo(action)
         raise CommandError(f"undo: unexpected failure: {error}") from error
+    finally:
+        shell.fs_cache.invalidate(*_action_paths(action))
 
 
-def _undo_copy(action: dict[str, str]) -> str:
+def _action_paths(action: dict) -> list[str]:
+    """Возвращает пути, которые затрагивает отмена действия."""
+    keys = ("target", "source", "destination", "original", "trash")
+    paths = [action[key] for key in keys if key in action]
+    paths.extend(trash for _original, trash in action.get("trashed", []))
+    return paths
+
+
+def _undo_copy(action: dict) -> str:
     """Удаляет файл или каталог, созданный командой cp."""
+    if "created" in action:
+        return _undo_sync(action)
     target = Path(action["target"])
     if not target.exists():
         raise CommandError(f"undo: copied target '{target}' no longer exists")
@@ -46,6 +59,39 @@ def _undo_copy(action: dict[str, str]) -> str:
     return f"Undo: removed '{target}'"
 
 
+def _undo_sync(action: dict) -> str:
+    """Откатывает cp -u: удаляет созданное и возвращает вытесненное из корзины.
+
+    Сначала проверяется, что все записи корзины на месте, чтобы не
+    оставить приёмник откаченным наполовину.
+    """
+    target = action["target"]
+    trashed = action["trashed"]
+    missing = [trash for _original, trash in trashed
+               if not os.path.lexists(trash)]
+    if missing:
+        raise CommandError(f"undo: trash entry '{missing[0]}' missing")
+
+    for path in reversed(action["created"]):
+        _remove_path(path)
+    for original, trash in reversed(trashed):
+        _remove_path(original)
+        shutil.move(trash, original, copy_function=copy_file)
+    logger.debug(f"undo sync reverted {target}")
+    return (
+        f"Undo: reverted '{target}' ({len(action['created'])} removed, "
+        f"{len(trashed)} restored)"
+    )
+
+
+def _remove_path(path: str) -> None:
+    """Удаляет файл, ссылку или каталог, если они ещё существуют."""
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    elif os.path.lexists(path):
+        os.unlink(path)
+
+
 def _undo_move(action: dict[str, str]) -> str:
     """Возвращает файл или каталог на исходное место после mv."""
     source = Path(action["source"])
@@ -53,7 +99,7 @@ def _undo_move(action: dict[str, str]) -> str:
     if not destination.exists():
         raise CommandError(f"undo: moved target '{destination}' not found")
     source.parent.mkdir(parents=True, exist_ok=True)
-    shutil.move(str(destination), str(source))
+    shutil.move(str(destination), str(source), copy_function=copy_file)
     logger.debug(f"undo move restored {source} from {destination}")
     return f"Undo: moved back to '{source}'"
 
@@ -65,6 +111,6 @@ def _undo_remove(action: dict[str, str]) -> str:
     if not trash_path.exists():
         raise CommandError(f"undo: trash entry '{trash_path}' missing")
     original.parent.mkdir(parents=True, exist_ok=True)
-    shutil.move(str(trash_path), str(original))
+    shutil.move(str(trash_path), str(original), copy_function=copy_file)
     logger.debug(f"undo remove restored {original} from {trash_path}")
     return f"Undo: restored '{original}'"
@@ -76,7 +76,7 @@ def run(args: list[str], shell) -> str:
     if len(args) != 1:
         raise CommandError("Usage: untar <archive.tar.gz>")
 
-    archive_path = resolve_path(args[0], shell.cwd)
+    archive_path = resolve_path(args[0], shell.cwd, shell.fs_cache)
     if not archive_path.exists():
         raise CommandError(f"untar: '{archive_path}' not found")
     if archive_path.is_dir():
@@ -122,8 +122,10 @@ def run(args: list[str], shell) -> str:
                 adjusted_members.append(member)
 
             tf.extractall(target_dir, adjusted_members)
+        shell.fs_cache.invalidate(output_root)
         logger.debug(f"untarred {archive_path} to {output_root}")
         return f"Unpacked '{archive_path}' to '{output_root}'"
     except Exception as error:
+        shell.fs_cache.invalidate(target_dir)
         logger.exception(f"untar error: {error}")
         raise CommandError(f"untar: error extracting archive: {error}")
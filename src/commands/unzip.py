@@ -64,7 +64,7 @@ def run(args: list[str], shell) -> str:
     if len(args) != 1:
         raise CommandError("Usage: unzip <archive.zip>")
 
-    archive_path = resolve_path(args[0], shell.cwd)
+    archive_path = resolve_path(args[0], shell.cwd, shell.fs_cache)
     if not archive_path.exists():
         raise CommandError(f"unzip: '{archive_path}' not found")
     if archive_path.is_dir():
@@ -113,8 +113,10 @@ def run(args: list[str], shell) -> str:
                 destination.parent.mkdir(parents=True, exist_ok=True)
                 with zf.open(info) as source, destination.open("wb") as target:
                     shutil.copyfileobj(source, target)
+        shell.fs_cache.invalidate(output_root)
         logger.debug(f"unzipped {archive_path} to {output_root}")
         return f"Unpacked '{archive_path}' to '{output_root}'"
     except Exception as error:
+        shell.fs_cache.invalidate(target_dir)
         logger.exception(f"unzip error: {error}")
         raise CommandError(f"unzip: error extracting archive: {error}")
@@ -1,16 +1,601 @@
+import bz2
+import codecs
+import errno
+import gzip
+import lzma
+from collections import OrderedDict, deque
+from datetime import datetime
+from itertools import count
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatch
+from functools import lru_cache
 from pathlib import Path
+from types import ModuleType
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Generator,
+    Iterable,
+    Iterator,
+    TypeVar,
+    cast,
+)
+import io
 import os
+import re
+import shutil
+import stat
+import threading
+import time
+
+from src import config
+
+fcntl: ModuleType | None
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - нет на Windows
+    fcntl = None
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+IgnoreRule = tuple[str, str, bool, bool]
+CacheRecord = tuple[str, int, object]
+
+RACY_WINDOW_NS = 2_000_000_000
+TRASH_SEQUENCE = count()
+
+COMPRESSION_OPENERS: dict[str, Callable[[Path], BinaryIO]] = {
+    "gzip": lambda path: cast(BinaryIO, gzip.open(path, "rb")),
+    "bz2": lambda path: cast(BinaryIO, bz2.open(path, "rb")),
+    "xz": lambda path: cast(BinaryIO, lzma.open(path, "rb")),
+}
+COMPRESSION_SNIFF_SIZE = 10
+
+FICLONE = 0x40049409
+COPY_BUFFER_SIZE = 1024 * 1024
+SPECIAL_FILE_KINDS: tuple[tuple[Callable[[int], bool], str], ...] = (
+    (stat.S_ISFIFO, "named pipe"),
+    (stat.S_ISSOCK, "socket"),
+    (stat.S_ISCHR, "character device"),
+    (stat.S_ISBLK, "block device"),
+)
+UNSUPPORTED_COPY_ERRNOS = frozenset(
+    {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF}
+)
 
 
 class CommandError(Exception):
     """Исключение для предсказуемых ошибок команд."""
 
 
-def resolve_path(path_str: str, cwd: Path) -> Path:
+def resolve_path(path_str: str, cwd: Path,
+                 cache: "MetadataCache | None" = None) -> Path:
     """Возвращает абсолютный путь, учитывая ~ и относительные сегменты."""
+    if cache is not None:
+        return cache.resolve(path_str, cwd)
     if path_str.startswith("~"):
         return Path(os.path.expanduser(path_str)).resolve()
     path = Path(path_str)
     if path.is_absolute():
         return path.resolve()
     return (cwd / path).resolve()
+
+
+def move_to_trash(path: Path, trash_root: Path) -> Path:
+    """Перемещает объект в корзину и возвращает путь назначения.
+
+    К имени добавляются время, pid и порядковый номер, поэтому потоки,
+    убирающие одноимённые файлы одновременно, не затирают друг друга.
+    """
+    trash_root.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
+    suffix = f"{timestamp}_{os.getpid()}_{next(TRASH_SEQUENCE)}"
+    trash_path = trash_root / f"{path.name}.{suffix}"
+    shutil.move(str(path), str(trash_path), copy_function=copy_file)
+    return trash_path
+
+
+def has_os_descriptor(handle) -> bool:
+    """Проверяет, что файловый объект опирается на настоящий дескриптор ОС."""
+    raw = getattr(handle, "raw", handle)
+    return isinstance(raw, io.FileIO)
+
+
+class MetadataCache:
+    """Кэш метаданных файловой системы, общий для команд оболочки.
+
+    Хранит разрешённые пути, тип и существование путей и листинги
+    каталогов. Записи о пути сверяются с mtime родительского каталога,
+    листинги — с mtime самого каталога: создание, удаление и переименование элемента меняют mtime
+    родителя. Пути, разрешённые через символические ссылки или «..», не
+    кэшируются: перенаправление ссылки не меняет mtime итогового
+    каталога. Каталоги, изменённые менее чем за ``RACY_WINDOW_NS`` до
+    чтения, не кэшируются, чтобы не пропустить второе изменение в
+    пределах одного тика часов ФС. При переполнении таблицы вытесняются
+    записи, к которым дольше всего не обращались.
+    """
+
+    def __init__(self, size: int | None = None) -> None:
+        """Создаёт пустой кэш с ограничением числа записей в каждой таблице."""
+        self.size = config.FS_CACHE_SIZE if size is None else size
+        self.counters = {
+            "resolve": [0, 0],
+            "lookup": [0, 0],
+            "listing": [0, 0],
+        }
+        self._tables: dict[str, OrderedDict] = {
+            kind: OrderedDict() for kind in self.counters}
+        self._lock = threading.Lock()
+
+    def resolve(self, path_str: str, cwd: Path) -> Path:
+        """Разрешает путь как resolve_path, повторно используя прошлый ответ."""
+        key = (str(cwd), path_str)
+        found, path = self._fetch("resolve", key)
+        if found:
+            return path
+        path = resolve_path(path_str, cwd)
+        if _resolves_directly(path_str, cwd, path):
+            self._store("resolve", key, str(path.parent), path)
+        return path
+
+    def lookup(self, path: Path) -> int | None:
+        """Возвращает st_mode пути (по ссылкам) или None, если пути нет.
+
+        Размер и время из кэша не отдаются: они меняются без изменения
+        mtime каталога, а тип и существование — нет.
+        """
+        key = str(path)
+        found, mode = self._fetch("lookup", key)
+        if found:
+            return mode
+        try:
+            mode = os.stat(path).st_mode
+        except (FileNotFoundError, NotADirectoryError):
+            mode = None
+        self._store("lookup", key, os.path.dirname(key), mode)
+        return mode
+
+    def exists(self, path: Path) -> bool:
+        """Проверяет существование пути через кэш."""
+        return self.lookup(path) is not None
+
+    def is_dir(self, path: Path) -> bool:
+        """Проверяет, что путь ведёт в каталог, через кэш."""
+        mode = self.lookup(path)
+        return mode is not None and stat.S_ISDIR(mode)
+
+    def listing(self, directory: str | Path) -> list[os.DirEntry]:
+        """Возвращает элементы каталога в порядке scandir.
+
+        Элементы годятся для имён и типов (is_dir без перехода по ссылкам);
+        свежие stat-данные нужно получать отдельно.
+        """
+        key = str(directory)
+        found, entries = self._fetch("listing", key)
+        if found:
+            return entries
+        with os.scandir(key) as iterator:
+            entries = list(iterator)
+        self._store("listing", key, key, entries)
+        return entries
+
+    def invalidate(self, *paths: Path | str) -> None:
+        """Сбрасывает записи о путях, их поддеревьях и листинги родителей."""
+        with self._lock:
+            for path in paths:
+                text = str(path)
+                prefix = text.rstrip(os.sep) + os.sep
+                parent = os.path.dirname(text)
+
+                def affected(candidate: str) -> bool:
+                    return candidate == text or candidate.startswith(prefix)
+
+                lookups = self._tables["lookup"]
+                for key in [key for key in lookups if affected(key)]:
+                    del lookups[key]
+                listings = self._tables["listing"]
+                for key in [key for key in listings
+                            if key == parent or affected(key)]:
+                    del listings[key]
+                resolved = self._tables["resolve"]
+                for key in [key for key, record in resolved.items()
+                            if affected(str(record[2]))]:
+                    del resolved[key]
+
+    def hit_rates(self) -> dict[str, tuple[int, int]]:
+        """Возвращает число попаданий и промахов по каждой таблице."""
+        with self._lock:
+            return {kind: (hits, misses)
+                    for kind, (hits, misses) in self.counters.items()}
+
+    def _fetch(self, kind: str, key) -> tuple[bool, Any]:
+        """Достаёт запись, если её каталог не менялся с момента сохранения."""
+        with self._lock:
+            record = self._tables[kind].get(key)
+        if record is not None:
+            directory, mtime, value = record
+            if _mtime_ns(directory) == mtime:
+                with self._lock:
+                    self.counters[kind][0] += 1
+                    if key in self._tables[kind]:
+                        self._tables[kind].move_to_end(key)
+                return True, value
+        with self._lock:
+            self.counters[kind][1] += 1
+        return False, None
+
+    def _store(self, kind: str, key, directory: str, value) -> None:
+        """Сохраняет запись, если каталог не менялся слишком недавно."""
+        mtime = _mtime_ns(directory)
+        if mtime is None or time.time_ns() - mtime < RACY_WINDOW_NS:
+            return
+        with self._lock:
+            table = self._tables[kind]
+            table.pop(key, None)
+            table[key] = (directory, mtime, value)
+            if len(table) > self.size:
+                table.popitem(last=False)
+
+
+def _resolves_directly(path_str: str, cwd: Path, resolved: Path) -> bool:
+    """Проверяет, что путь разрешился без символических ссылок и «..»."""
+    expanded = os.path.expanduser(path_str)
+    if ".." in Path(expanded).parts:
+        return False
+    return os.path.normpath(os.path.join(cwd, expanded)) == str(resolved)
+
+
+def _mtime_ns(directory: str) -> int | None:
+    """Возвращает mtime каталога в наносекундах или None, если он недоступен."""
+    try:
+        return os.stat(directory).st_mtime_ns
+    except OSError:
+        return None
+
+
+def copy_file(source: str | Path, target: str | Path) -> str:
+    """Копирует файл с метаданными, как copy2, и возвращает способ копирования.
+
+    Способы пробуются от дешёвого к дорогому: reflink (FICLONE) делит
+    блоки файла за постоянное время, разреженный файл переносится по
+    участкам с данными (SEEK_DATA/SEEK_HOLE) с сохранением дыр,
+    copy_file_range и sendfile гонят данные внутри ядра, и только затем
+    идёт копирование через буферы Python. Всё, кроме последнего способа,
+    доступно лишь для настоящих дескрипторов ОС. Подходит как
+    copy_function для shutil.move и shutil.copytree.
+    """
+    if os.path.exists(target) and os.path.samefile(source, target):
+        raise shutil.SameFileError(
+            f"{source!r} and {target!r} are the same file")
+    _reject_special_file(source, SPECIAL_FILE_KINDS)
+    _reject_special_file(target, SPECIAL_FILE_KINDS[:1])
+    with open(source, "rb") as reader, open(target, "wb") as writer:
+        mode = _copy_data(reader, writer)
+    shutil.copystat(source, target)
+    return mode
+
+
+def _reject_special_file(
+    path: str | Path, kinds: tuple[tuple[Callable[[int], bool], str], ...]
+) -> None:
+    """Не даёт открыть канал или устройство: чтение из них может не кончиться."""
+    try:
+        mode = os.stat(path).st_mode
+    except OSError:
+        return
+    for is_kind, name in kinds:
+        if is_kind(mode):
+            raise shutil.SpecialFileError(f"`{path}` is a {name}")
+
+
+def _copy_data(reader: BinaryIO, writer: BinaryIO) -> str:
+    """Переносит содержимое первым сработавшим способом и называет его."""
+    if has_os_descriptor(reader) and has_os_descriptor(writer):
+        source = reader.fileno()
+        target = writer.fileno()
+        size = os.fstat(source).st_size
+        if _reflink(source, target):
+            return "reflink"
+        if _is_sparse(source) and _copy_sparse(source, target, size):
+            return "sparse"
+        if hasattr(os, "copy_file_range") and _kernel_copy(
+            lambda offset: os.copy_file_range(
+                source, target, config.COPY_KERNEL_CHUNK, offset, offset),
+            size,
+        ):
+            return "copy_file_range"
+        if hasattr(os, "sendfile") and _kernel_copy(
+            lambda offset: os.sendfile(
+                target, source, offset, config.COPY_KERNEL_CHUNK),
+            size,
+        ):
+            return "sendfile"
+    shutil.copyfileobj(reader, writer)
+    return "userspace"
+
+
+def _reflink(source: int, target: int) -> bool:
+    """Пробует клонировать файл ioctl FICLONE (Btrfs, XFS и подобные ФС)."""
+    if fcntl is None:
+        return False
+    try:
+        fcntl.ioctl(target, FICLONE, source)
+    except OSError:
+        return False
+    return True
+
+
+def _is_sparse(descriptor: int) -> bool:
+    """Проверяет, что файл занимает на диске меньше своего размера."""
+    stats = os.fstat(descriptor)
+    blocks = getattr(stats, "st_blocks", None)
+    return (
+        hasattr(os, "SEEK_DATA")
+        and blocks is not None
+        and blocks * 512 < stats.st_size
+    )
+
+
+def _copy_sparse(source: int, target: int, size: int) -> bool:
+    """Копирует только участки с данными, оставляя дыры дырами.
+
+    False означает, что ФС не умеет SEEK_DATA и ничего не скопировано.
+    """
+    try:
+        offset = os.lseek(source, 0, os.SEEK_DATA)
+    except OSError as error:
+        if error.errno == errno.ENXIO:
+            offset = size
+        elif error.errno in UNSUPPORTED_COPY_ERRNOS:
+            return False
+        else:
+            raise
+    while offset < size:
+        end = min(os.lseek(source, offset, os.SEEK_HOLE), size)
+        _copy_range(source, target, offset, end)
+        try:
+            offset = os.lseek(source, end, os.SEEK_DATA)
+        except OSError as error:
+            if error.errno != errno.ENXIO:
+                raise
+            break
+    os.ftruncate(target, size)
+    return True
+
+
+def _copy_range(source: int, target: int, start: int, end: int) -> None:
+    """Копирует участок [start, end) по тем же смещениям в приёмнике."""
+    use_kernel = hasattr(os, "copy_file_range")
+    while start < end:
+        count = min(end - start, config.COPY_KERNEL_CHUNK)
+        sent = 0
+        if use_kernel:
+            try:
+                sent = os.copy_file_range(source, target, count, start, start)
+            except OSError as error:
+                if error.errno not in UNSUPPORTED_COPY_ERRNOS:
+                    raise
+        if sent == 0:
+            use_kernel = False
+            data = os.pread(source, min(count, COPY_BUFFER_SIZE), start)
+            if not data:
+                return
+            sent = os.pwrite(target, data, start)
+        start += sent
+
+
+def _kernel_copy(send: Callable[[int], int], size: int) -> bool:
+    """Повторяет ядерный вызов копирования до конца файла.
+
+    False означает, что вызов не поддерживается и ещё ничего не
+    скопировано, поэтому можно перейти к следующему способу.
+    """
+    copied = 0
+    while True:
+        try:
+            sent = send(copied)
+        except OSError as error:
+            if copied == 0 and error.errno in UNSUPPORTED_COPY_ERRNOS:
+                return False
+            raise
+        if sent == 0:
+            return copied > 0 or size == 0
+        copied += sent
+
+
+def compression_format(head: bytes) -> str | None:
+    """Определяет gzip, bzip2 или xz по сигнатуре в начале файла."""
+    if head.startswith(b"\x1f\x8b\x08"):
+        return "gzip"
+    if (
+        head[:3] == b"BZh"
+        and head[3:4].isdigit()
+        and head[4:10] in (b"\x31\x41\x59\x26\x53\x59",
+                           b"\x17\x72\x45\x38\x50\x90")
+    ):
+        return "bz2"
+    if head.startswith(b"\xfd7zXZ\x00"):
+        return "xz"
+    return None
+
+
+def looks_binary(head: bytes) -> bool:
+    """Определяет двоичный файл по NUL-байтам и доле невалидного UTF-8."""
+    if not head:
+        return False
+    if b"\0" in head:
+        return True
+    decoded = head.decode("utf-8", errors="ignore").encode("utf-8")
+    invalid = len(head) - len(decoded)
+    return invalid / len(head) > config.GREP_BINARY_INVALID_RATIO
+
+
+def open_decompressed(path: Path) -> BinaryIO:
+    """Открывает файл на чтение, на лету распаковывая gzip, bzip2 и xz.
+
+    Распаковка идёт потоком по мере чтения, поэтому в памяти никогда
+    не оказывается всё распакованное содержимое.
+    """
+    with open(path, "rb") as probe:
+        kind = compression_format(probe.read(COMPRESSION_SNIFF_SIZE))
+    if kind is None:
+        return open(path, "rb")
+    return COMPRESSION_OPENERS[kind](path)
+
+
+def read_chunks(handle: BinaryIO, size: int) -> Iterator[bytes]:
+    """Читает файл блоками фиксированного размера до конца."""
+    while True:
+        chunk = handle.read(size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def decode_chunks(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Декодирует поток байтов как UTF-8, пропуская некорректные байты.
+
+    Многобайтовый символ на границе блоков собирается инкрементальным
+    декодером, поэтому блоки можно резать где угодно.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+@lru_cache(maxsize=config.REGEX_CACHE_SIZE)
+def compile_pattern(pattern: str | bytes, flags: int = 0) -> re.Pattern:
+    """Компилирует регулярное выражение через общий LRU-кэш процесса."""
+    return re.compile(pattern, flags)
+
+
+def map_ordered(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    workers: int,
+) -> Generator[R, None, None]:
+    """Применяет функцию в пуле потоков, отдавая результаты в исходном порядке."""
+    if workers <= 1:
+        for item in items:
+            yield func(item)
+        return
+
+    window = workers * 4
+    pending: deque = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        try:
+            for item in items:
+                pending.append(pool.submit(func, item))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def walk_tree(
+    root: Path,
+    prune: Iterable[str] | None = None,
+    ignore_file: str | None = None,
+    include_dirs: bool = False,
+    cache: MetadataCache | None = None,
+) -> Iterator[os.DirEntry]:
+    """Лениво обходит дерево через os.scandir, отсекая каталоги до спуска.
+
+    Элементы каждого каталога отдаются в порядке имён, поэтому порядок
+    обхода детерминирован. Каталоги из ``prune`` и пути, совпавшие с
+    шаблонами из файлов ``ignore_file``, не посещаются вовсе. С ``cache``
+    листинги неизменившихся каталогов берутся из кэша оболочки.
+    """
+    pruned = frozenset(config.WALK_PRUNE if prune is None else prune)
+    try:
+        root_entries = _sorted_entries(str(root), cache)
+    except OSError:
+        return
+    root_rules = _read_ignore_rules(str(root), ignore_file)
+    stack = [(iter(root_entries), root_rules)]
+
+    while stack:
+        entries, rules = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+        if entry.name in pruned:
+            continue
+        is_dir = entry.is_dir(follow_symlinks=False)
+        if rules and _is_ignored(entry.path, is_dir, rules):
+            continue
+        if not is_dir:
+            yield entry
+            continue
+        if include_dirs:
+            yield entry
+        try:
+            children = _sorted_entries(entry.path, cache)
+        except OSError:
+            continue
+        child_rules = rules + _read_ignore_rules(entry.path, ignore_file)
+        stack.append((iter(children), child_rules))
+
+
+def _sorted_entries(directory: str,
+                    cache: MetadataCache | None = None) -> list[os.DirEntry]:
+    """Возвращает элементы каталога, упорядоченные по имени."""
+    if cache is not None:
+        return sorted(cache.listing(directory), key=lambda entry: entry.name)
+    with os.scandir(directory) as iterator:
+        return sorted(iterator, key=lambda entry: entry.name)
+
+
+def _read_ignore_rules(
+    directory: str, ignore_file: str | None
+) -> list[IgnoreRule]:
+    """Читает шаблоны игнорирования, действующие внутри каталога."""
+    if ignore_file is None:
+        return []
+    try:
+        with open(os.path.join(directory, ignore_file), encoding="utf-8") as handle:
+            lines = handle.read().splitlines()
+    except (OSError, UnicodeDecodeError):
+        return []
+
+    rules: list[IgnoreRule] = []
+    for raw in lines:
+        line = raw.strip()
+        if not line or line.startswith(("#", "!")):
+            continue
+        dir_only = line.endswith("/")
+        pattern = line.rstrip("/")
+        anchored = "/" in pattern
+        rules.append((directory, pattern.lstrip("/"), dir_only, anchored))
+    return rules
+
+
+def _is_ignored(path: str, is_dir: bool, rules: list[IgnoreRule]) -> bool:
+    """Проверяет путь по шаблонам игнорирования в стиле .gitignore.
+
+    Шаблон со слэшем в начале или середине привязан к каталогу своего
+    файла игнорирования и сравнивается с относительным путём, остальные —
+    с именем в любой глубине.
+    """
+    name = os.path.basename(path)
+    for base, pattern, dir_only, anchored in rules:
+        if dir_only and not is_dir:
+            continue
+        if anchored:
+            relative = os.path.relpath(path, base).replace(os.sep, "/")
+            if fnmatch(relative, pattern):
+                return True
+        elif fnmatch(name, pattern):
+            return True
+    return False
@@ -0,0 +1,105 @@
+import logging
+import os
+import stat
+from pathlib import Path
+from typing import Iterator
+
+from src import config
+
+from .utils import CommandError, map_ordered, read_chunks, resolve_path
+
+logger = logging.getLogger("shell")
+
+USAGE = "Usage: wc [-l] [-w] [-c] <file>..."
+COUNTERS = ("lines", "words", "bytes")
+FLAG_COUNTERS = {"l": "lines", "w": "words", "c": "bytes"}
+
+Counts = tuple[int, int, int]
+
+
+def run(args: list[str], shell) -> Iterator[str]:
+    """Считает строки, слова и байты в файлах, распределяя их по пулу потоков."""
+    selected: set[str] = set()
+    names: list[str] = []
+    for arg in args:
+        if arg.startswith("-") and len(arg) > 1:
+            for flag in arg[1:]:
+                if flag not in FLAG_COUNTERS:
+                    raise CommandError(f"wc: unsupported option '{arg}'")
+                selected.add(FLAG_COUNTERS[flag])
+        else:
+            names.append(arg)
+    if not names:
+        raise CommandError(USAGE)
+
+    counters = [name for name in COUNTERS if name in selected] or list(COUNTERS)
+    paths: list[Path] = []
+    largest = 0
+    for name in names:
+        path = resolve_path(name, shell.cwd, shell.fs_cache)
+        try:
+            stats = os.stat(path)
+        except FileNotFoundError as error:
+            raise CommandError(f"wc: '{name}' not found") from error
+        if stat.S_ISDIR(stats.st_mode):
+            raise CommandError(f"wc: '{name}' is a directory")
+        paths.append(path)
+        largest += stats.st_size
+
+    logger.debug("wc executed with args: %s", args)
+    width = len(str(largest))
+    return _iter_report(paths, names, counters, width)
+
+
+def _iter_report(paths: list[Path], names: list[str], counters: list[str],
+                 width: int) -> Iterator[str]:
+    """Отдаёт строки по файлам в исходном порядке и итог для нескольких файлов."""
+    workers = config.WC_WORKERS if len(paths) > 1 else 1
+    totals = [0, 0, 0]
+
+    def count(path: Path) -> Counts:
+        return _count_file(path, counters)
+
+    for name, counts in zip(names, map_ordered(count, paths, workers)):
+        for position, value in enumerate(counts):
+            totals[position] += value
+        yield _format_line(counts, counters, width, name)
+    if len(paths) > 1:
+        line_total, word_total, byte_total = totals
+        yield _format_line(
+            (line_total, word_total, byte_total), counters, width, "total")
+
+
+def _count_file(path: Path, counters: list[str]) -> Counts:
+    """Считает файл по двоичным блокам, не декодируя и не деля его на строки.
+
+    Переводы строк считаются через bytes.count, слова — через
+    bytes.split с поправкой на слово, разрезанное границей блока. Для
+    одного только -c файл не читается: хватает размера из stat.
+    """
+    if counters == ["bytes"]:
+        return 0, 0, os.stat(path).st_size
+
+    want_lines = "lines" in counters
+    want_words = "words" in counters
+    lines = words = size = 0
+    in_word = False
+    with path.open("rb") as handle:
+        for chunk in read_chunks(handle, config.WC_CHUNK_SIZE):
+            size += len(chunk)
+            if want_lines:
+                lines += chunk.count(b"\n")
+            if want_words:
+                words += len(chunk.split())
+                if in_word and not chunk[:1].isspace():
+                    words -= 1
+                in_word = not chunk[-1:].isspace()
+    return lines, words, size
+
+
+def _format_line(counts: Counts, counters: list[str], width: int,
+                 name: str) -> str:
+    """Форматирует выбранные счётчики, выравнивая их по общей ширине."""
+    values = dict(zip(COUNTERS, counts))
+    columns = " ".join(f"{values[counter]:>{width}}" for counter in counters)
+    return f"{columns} {name}\n"
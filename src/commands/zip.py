@@ -2,20 +2,11 @@ import logging
 import zipfile
 from pathlib import Path
 
-from .utils import CommandError, resolve_path
+from .utils import CommandError, resolve_path, walk_tree
 
 logger = logging.getLogger("shell")
 
-
-def _should_skip(path: Path, source: Path) -> bool:
-    """Возвращает True, если элемент попадает в служебный каталог .git."""
-    if path == source:
-        return False
-    try:
-        relative = path.relative_to(source)
-    except ValueError:
-        return False
-    return any(part == ".git" for part in relative.parts)
+SKIPPED_DIRS = frozenset({".git"})
 
 
 def run(args: list[str], shell) -> str:
@@ -39,9 +30,10 @@ def run(args: list[str], shell) -> str:
             compression=zipfile.ZIP_DEFLATED,
         ) as zf:
             zf.write(source, source.name)
-            for item in source.rglob("*"):
-                if _should_skip(item, source):
-                    continue
+            for entry in walk_tree(
+                source, prune=SKIPPED_DIRS, include_dirs=True
+            ):
+                item = Path(entry.path)
                 arcname = Path(source.name) / item.relative_to(source)
                 zf.write(item, str(arcname))
         logger.debug(f"created zip {archive_path} from {source}")
@@ -49,3 +41,5 @@ def run(args: list[str], shell) -> str:
     except Exception as error:
         logger.exception(f"zip error: {error}")
         raise CommandError(f"zip: error creating archive: {error}")
+    finally:
+        shell.fs_cache.invalidate(archive_path)
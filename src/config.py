@@ -1,8 +1,34 @@
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 LOG_FILE = BASE_DIR / "shell.log"
 HISTORY_FILE = BASE_DIR / "history.log"
 TRASH_DIR = BASE_DIR / ".trash"
+INDEX_DIR = BASE_DIR / ".index"
 
 LOG_LEVEL = "INFO"
+
+WALK_PRUNE = frozenset({".git", TRASH_DIR.name, INDEX_DIR.name})
+IGNORE_FILE = ".gitignore"
+
+GREP_WORKERS = min(8, os.cpu_count() or 1)
+GREP_MAX_OUTPUT_LINES = 10_000
+GREP_MMAP_THRESHOLD = 64 * 1024 * 1024
+GREP_MMAP_WINDOW = 8 * 1024 * 1024
+GREP_BINARY_SNIFF_SIZE = 8192
+GREP_BINARY_INVALID_RATIO = 0.3
+CAT_CHUNK_SIZE = 64 * 1024
+CP_WORKERS = 8
+COPY_KERNEL_CHUNK = 1024 * 1024 * 1024
+WC_CHUNK_SIZE = 1024 * 1024
+WC_WORKERS = min(8, os.cpu_count() or 1)
+TAIL_BLOCK_SIZE = 64 * 1024
+TAIL_POLL_MIN = 0.1
+TAIL_POLL_MAX = 1.0
+LS_STAT_WORKERS = 16
+LS_STAT_BATCH = 256
+DU_WORKERS = 16
+REGEX_CACHE_SIZE = 256
+FS_CACHE_SIZE = 4096
+INDEX_MAX_FILE_SIZE = 16 * 1024 * 1024
@@ -1,5 +1,6 @@
 import shlex
 from pathlib import Path
+from typing import Iterable
 
 import typer
 
@@ -8,19 +9,25 @@ from src.commands import (
     cat,
     cd,
     cp,
+    du,
     grep,
+    head,
     history,
+    index,
     ls,
     mv,
     pwd,
     rm,
+    stats,
+    tail,
     tar,
     undo,
     untar,
     unzip,
+    wc,
     zip,
 )
-from src.commands.utils import CommandError
+from src.commands.utils import CommandError, MetadataCache
 from src.logger_config import setup_logger
 
 
@@ -36,7 +43,9 @@ class Shell:
         self.history_file.touch(exist_ok=True)
         self.trash_dir = Path(config.TRASH_DIR)
         self.trash_dir.mkdir(parents=True, exist_ok=True)
-        self.undo_stack: list[dict[str, str]] = []
+        self.undo_stack: list[dict] = []
+        self.notices: list[str] = []
+        self.fs_cache = MetadataCache()
 
         self._register_builtin_commands()
         self._register_internal_commands()
@@ -62,6 +71,12 @@ class Shell:
             "tar": tar,
             "untar": untar,
             "grep": grep,
+            "index": index,
+            "stats": stats,
+            "du": du,
+            "head": head,
+            "tail": tail,
+            "wc": wc,
         }
 
         for name, module in mapping.items():
@@ -86,16 +101,20 @@ class Shell:
             return lines
         return lines[-limit:]
 
-    def push_undo(self, action: dict[str, str]) -> None:
+    def push_undo(self, action: dict) -> None:
         """Добавляет обратимое действие в стек undo."""
         self.undo_stack.append(action)
 
-    def pop_undo(self) -> dict[str, str] | None:
+    def pop_undo(self) -> dict | None:
         """Извлекает последнее обратимое действие."""
         if not self.undo_stack:
             return None
         return self.undo_stack.pop()
 
+    def notify(self, message: str) -> None:
+        """Откладывает служебное сообщение до вывода результата команды."""
+        self.notices.append(message)
+
     def run(self) -> None:
         """Запускает REPL-цикл до выхода пользователя."""
         self._show_banner()
@@ -118,8 +137,12 @@ class Shell:
         self.logger.info(command_line)
         try:
             result = self.execute(command_line)
-            if result:
-                self._echo_success(result)
+            if isinstance(result, str):
+                if result:
+                    self._echo_success(result)
+            elif result is not None:
+                self._echo_stream(result)
+            self._flush_notices()
         except CommandError as error:
             message = str(error)
             self._echo_error(message)
@@ -130,8 +153,17 @@ class Shell:
             message = f"Unexpected error: {error}"
             self._echo_error(message)
             self.logger.error(f"ERROR: {message}")
+        finally:
+            self.notices.clear()
+
+    def _flush_notices(self) -> None:
+        """Печатает и логирует накопленные служебные сообщения."""
+        for notice in self.notices:
+            self._echo_info(notice)
+            self.logger.debug(notice)
+        self.notices.clear()
 
-    def execute(self, command_line: str) -> str | None:
+    def execute(self, command_line: str) -> str | Iterable[str] | None:
         """Разбирает строку и запускает соответствующую команду."""
         parts = shlex.split(command_line)
         if not parts:
@@ -180,10 +212,25 @@ class Shell:
         """Выводит результат команды зелёным цветом."""
         typer.secho(message, fg=typer.colors.BRIGHT_GREEN)
 
+    def _echo_stream(self, chunks: Iterable[str]) -> None:
+        """Печатает потоковый результат команды по мере поступления."""
+        ends_with_newline = True
+        for chunk in chunks:
+            if not chunk:
+                continue
+            typer.secho(chunk, fg=typer.colors.BRIGHT_GREEN, nl=False)
+            ends_with_newline = chunk.endswith("\n")
+        if not ends_with_newline:
+            typer.echo("")
+
     def _echo_error(self, message: str) -> None:
         """Печатает сообщение об ошибке в рамке."""
         typer.secho(self._boxed_text(message), fg=typer.colors.BRIGHT_RED)
 
+    def _echo_info(self, message: str) -> None:
+        """Выводит служебную информацию приглушённым цветом."""
+        typer.secho(message, fg=typer.colors.BRIGHT_BLACK)
+
     def _echo_warning(self, message: str) -> None:
         """Выводит предупреждение жёлтым цветом."""
         typer.secho(message, fg=typer.colors.YELLOW)
@@ -3,6 +3,8 @@ from pathlib import Path
 import pytest
 from pyfakefs.fake_filesystem import FakeFilesystem
 
+from src.commands.utils import MetadataCache
+
 
 class ShellStub:
     """Минимальная заглушка оболочки для команд."""
@@ -12,6 +14,11 @@ class ShellStub:
         self.trash_dir = trash_dir
         self.undo_stack: list[dict[str, object]] = []
         self.history_entries: list[str] = []
+        self.notices: list[str] = []
+        self.fs_cache = MetadataCache()
+
+    def notify(self, message: str) -> None:
+        self.notices.append(message)
 
     def push_undo(self, action: dict[str, object]) -> None:
         self.undo_stack.append(action)
@@ -1,14 +1,25 @@
+import bz2
+import gzip
+import lzma
+import sys
+
 import pytest
 
+from src import config
 from src.commands import cat
 from src.commands.utils import CommandError
+from tests.conftest import ShellStub
+
+
+def _collect(args, shell):
+    return "".join(cat.run(args, shell))
 
 
 def test_cat_returns_file_contents(fs, shell):
     path = shell.cwd / "story.txt"
     fs.create_file(str(path), contents="line one\nline two")
 
-    result = cat.run([path.name], shell)
+    result = _collect([path.name], shell)
 
     assert result == "line one\nline two"
 
@@ -30,7 +41,7 @@ def test_cat_ignores_invalid_utf8(fs, shell):
     path = shell.cwd / "binary.dat"
     fs.create_file(str(path), contents=b"\xff\xfe\xfa")
 
-    output = cat.run([path.name], shell)
+    output = _collect([path.name], shell)
 
     assert output == ""
 
@@ -38,3 +49,54 @@ def test_cat_ignores_invalid_utf8(fs, shell):
 def test_cat_requires_single_argument(shell):
     with pytest.raises(CommandError):
         cat.run([], shell)
+
+
+def test_cat_streams_multiple_files_in_chunks(fs, shell, monkeypatch):
+    monkeypatch.setattr(config, "CAT_CHUNK_SIZE", 4)
+    fs.create_file(str(shell.cwd / "one.txt"), contents="привет\n")
+    fs.create_file(str(shell.cwd / "two.txt"), contents="world")
+
+    chunks = list(cat.run(["one.txt", "two.txt"], shell))
+
+    assert len(chunks) > 2
+    assert all(len(chunk.encode("utf-8")) <= 4 for chunk in chunks)
+    assert "".join(chunks) == "привет\nworld"
+
+
+def test_cat_validates_every_file_before_output(fs, shell):
+    fs.create_file(str(shell.cwd / "one.txt"), contents="one")
+
+    with pytest.raises(CommandError, match="not found"):
+        cat.run(["one.txt", "missing.txt"], shell)
+
+
+def test_cat_sends_file_to_non_tty_stdout(tmp_path, monkeypatch):
+    source = tmp_path / "data.bin"
+    source.write_bytes(b"payload\n" * 1000)
+    sink = tmp_path / "out.bin"
+    monkeypatch.setattr(config, "CAT_CHUNK_SIZE", 1024)
+
+    with sink.open("w") as stdout:
+        monkeypatch.setattr(sys, "stdout", stdout)
+        chunks = list(cat.run([source.name], ShellStub(cwd=tmp_path, trash_dir=tmp_path / "trash")))
+
+    assert chunks == []
+    assert sink.read_bytes() == source.read_bytes()
+
+
+@pytest.mark.parametrize("compress", [gzip.compress, bz2.compress, lzma.compress])
+def test_cat_decompresses_by_magic_bytes(fs, shell, monkeypatch, compress):
+    monkeypatch.setattr(config, "CAT_CHUNK_SIZE", 16)
+    text = "".join(f"rotated line {number}\n" for number in range(50))
+    fs.create_file(str(shell.cwd / "app.1"), contents=compress(text.encode()))
+
+    chunks = list(cat.run(["app.1"], shell))
+
+    assert max(len(chunk) for chunk in chunks) <= 16
+    assert "".join(chunks) == text
+
+
+def test_cat_keeps_plain_text_that_resembles_magic(fs, shell):
+    fs.create_file(str(shell.cwd / "notes.txt"), contents="BZh9 is a bzip2 header")
+
+    assert _collect(["notes.txt"], shell) == "BZh9 is a bzip2 header"
@@ -1,7 +1,12 @@
+import os
+import sys
+
 import pytest
 
-from src.commands import cp
+from src import config
+from src.commands import cp, ls, undo
 from src.commands.utils import CommandError
+from tests.conftest import ShellStub
 
 
 def test_cp_copies_file_into_new_path(fs, shell):
@@ -64,3 +69,241 @@ def test_cp_requires_two_positional_arguments(shell):
 def test_cp_raises_when_source_missing(shell):
     with pytest.raises(CommandError):
         cp.run(["missing.txt", "dest.txt"], shell)
+
+
+def test_cp_invalidates_cached_listing(fs, shell):
+    fs.create_file(str(shell.cwd / "a.txt"), contents="A")
+    os.utime(shell.cwd, (1_000_000, 1_000_000))
+    assert ls.run([], shell) == "a.txt"
+    assert ls.run([], shell) == "a.txt"
+
+    cp.run(["a.txt", "b.txt"], shell)
+    os.utime(shell.cwd, (1_000_000, 1_000_000))
+
+    assert ls.run([], shell).splitlines() == ["a.txt", "b.txt"]
+    assert shell.fs_cache.hit_rates()["listing"][0] == 1
+
+
+def test_cp_recursive_copies_tree_in_parallel_with_metadata(fs, shell, monkeypatch):
+    monkeypatch.setattr(config, "CP_WORKERS", 4)
+    source = shell.cwd / "tree"
+    for number in range(12):
+        path = source / f"dir{number % 3}" / "nested" / f"file{number}.txt"
+        fs.create_file(str(path), contents=f"data {number}")
+        os.utime(path, (1_000_000 + number, 1_000_000 + number))
+    fs.create_symlink(str(source / "link"), "dir0/nested/file0.txt")
+    fs.create_symlink(str(source / "linked_dir"), "dir1")
+    os.utime(source / "dir1", (2_000_000, 2_000_000))
+    os.chmod(source / "dir2" / "nested" / "file2.txt", 0o600)
+
+    cp.run(["-r", "tree", "copy"], shell)
+
+    target = shell.cwd / "copy"
+    for number in range(12):
+        copied = target / f"dir{number % 3}" / "nested" / f"file{number}.txt"
+        assert copied.read_text() == f"data {number}"
+        assert copied.stat().st_mtime == 1_000_000 + number
+    assert not (target / "link").is_symlink()
+    assert (target / "link").read_text() == "data 0"
+    assert (target / "link").stat().st_mtime == 1_000_000
+    assert not (target / "linked_dir").is_symlink()
+    assert (target / "linked_dir" / "nested" / "file1.txt").read_text() == "data 1"
+    assert (target / "dir1").stat().st_mtime == 2_000_000
+    assert (target / "dir2" / "nested" / "file2.txt").stat().st_mode & 0o777 == 0o600
+    assert shell.undo_stack[-1] == {"command": "cp", "target": str(target)}
+
+
+@pytest.mark.parametrize("destination", ["tree/backup", "tree/nested", "tree"])
+def test_cp_refuses_to_copy_directory_into_itself(fs, shell, destination):
+    fs.create_file(str(shell.cwd / "tree" / "nested" / "a.txt"), contents="A")
+
+    with pytest.raises(CommandError, match="into itself"):
+        cp.run(["-r", "tree", destination], shell)
+
+    assert sorted(os.listdir(shell.cwd / "tree")) == ["nested"]
+    assert os.listdir(shell.cwd / "tree" / "nested") == ["a.txt"]
+
+
+def test_cp_recursive_merges_into_existing_destination(fs, shell):
+    fs.create_file(str(shell.cwd / "src" / "a.txt"), contents="new")
+    fs.create_file(str(shell.cwd / "dst" / "src" / "a.txt"), contents="old")
+    fs.create_file(str(shell.cwd / "dst" / "src" / "keep.txt"), contents="keep")
+
+    cp.run(["-r", "src", "dst"], shell)
+
+    assert (shell.cwd / "dst" / "src" / "a.txt").read_text() == "new"
+    assert (shell.cwd / "dst" / "src" / "keep.txt").read_text() == "keep"
+
+
+def test_cp_verbose_reports_copy_mode(fs, shell):
+    fs.create_file(str(shell.cwd / "a.txt"), contents="A")
+    fs.create_file(str(shell.cwd / "tree" / "b.txt"), contents="B")
+    fs.create_file(str(shell.cwd / "tree" / "c.txt"), contents="C")
+
+    result = cp.run(["-v", "a.txt", "b.txt"], shell)
+    tree_result = cp.run(["-r", "-v", "tree", "copy"], shell)
+
+    assert result.endswith("(userspace: 1)")
+    assert tree_result.endswith("(userspace: 2)")
+    assert cp.run(["a.txt", "c.txt"], shell).endswith("c.txt'")
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="kernel copies are Linux-only")
+def test_cp_verbose_reports_kernel_copy_on_real_files(tmp_path):
+    stub = ShellStub(cwd=tmp_path, trash_dir=tmp_path / "trash")
+    (tmp_path / "big.bin").write_bytes(os.urandom(200_000))
+
+    result = cp.run(["-v", "big.bin", "copy.bin"], stub)
+
+    assert "userspace" not in result
+    assert (tmp_path / "copy.bin").read_bytes() == (tmp_path / "big.bin").read_bytes()
+    assert stub.undo_stack[-1] == {"command": "cp", "target": str(tmp_path / "copy.bin")}
+
+
+def _make_synced_tree(fs, shell):
+    source = shell.cwd / "src"
+    for name in ("a.txt", "b.txt", "sub/c.txt"):
+        fs.create_file(str(source / name), contents=f"data {name}")
+        os.utime(source / name, (1_000_000, 1_000_000))
+    fs.create_dir(str(shell.cwd / "dst"))
+    cp.run(["-r", "src", "dst"], shell)
+    return source, shell.cwd / "dst" / "src"
+
+
+def test_cp_update_copies_only_changed_files(fs, shell):
+    source, target = _make_synced_tree(fs, shell)
+    (source / "b.txt").write_text("changed")
+    fs.create_file(str(source / "sub" / "new.txt"), contents="fresh")
+
+    result = cp.run(["-r", "-u", "src", "dst"], shell)
+
+    assert result == (
+        f"Synced directory '{source}' -> '{target}': "
+        "2 copied, 2 skipped, 12 bytes transferred"
+    )
+    assert (target / "b.txt").read_text() == "changed"
+    assert (target / "sub" / "new.txt").read_text() == "fresh"
+
+
+def test_cp_update_recopies_file_when_only_mtime_differs(fs, shell):
+    source, target = _make_synced_tree(fs, shell)
+    os.utime(source / "a.txt", (2_000_000, 2_000_000))
+
+    result = cp.run(["-u", "src/a.txt", "dst/src/a.txt"], shell)
+
+    assert result.endswith("1 copied, 0 skipped, 10 bytes transferred")
+    assert (target / "a.txt").stat().st_mtime == 2_000_000
+
+
+def test_cp_update_checksum_compares_content(fs, shell):
+    source, target = _make_synced_tree(fs, shell)
+    os.utime(source / "a.txt", (2_000_000, 2_000_000))
+    (target / "b.txt").write_text("data X.txt")
+    os.utime(target / "b.txt", (1_000_000, 1_000_000))
+
+    assert cp.run(["-r", "-u", "src", "dst"], shell).endswith(
+        "1 copied, 2 skipped, 10 bytes transferred")
+    (target / "b.txt").write_text("data X.txt")
+    os.utime(target / "b.txt", (1_000_000, 1_000_000))
+    result = cp.run(["-r", "-u", "--checksum", "src", "dst"], shell)
+
+    assert result.endswith("1 copied, 2 skipped, 10 bytes transferred")
+    assert (target / "b.txt").read_text() == "data b.txt"
+
+
+def test_cp_update_delete_removes_extraneous_entries(fs, shell):
+    source, target = _make_synced_tree(fs, shell)
+    fs.create_file(str(target / "stale.txt"), contents="old")
+    fs.create_file(str(target / "gone" / "deep" / "file.txt"), contents="old")
+
+    result = cp.run(["-r", "-u", "--delete", "src", "dst"], shell)
+
+    assert result.endswith("0 copied, 3 skipped, 0 bytes transferred, 2 deleted")
+    assert not (target / "stale.txt").exists()
+    assert not (target / "gone").exists()
+    assert (target / "sub" / "c.txt").read_text() == "data sub/c.txt"
+    assert sorted(os.listdir(source)) == ["a.txt", "b.txt", "sub"]
+    trashed = sorted(path.name.split(".")[0] for path in shell.trash_dir.iterdir())
+    assert trashed == ["gone", "stale"]
+
+
+def test_cp_update_undo_reverts_only_what_the_sync_changed(fs, shell):
+    source, target = _make_synced_tree(fs, shell)
+    fs.create_file(str(target / "local.txt"), contents="keep me")
+    fs.create_file(str(target / "stale.txt"), contents="old")
+    (source / "b.txt").write_text("changed")
+    fs.create_file(str(source / "fresh" / "new.txt"), contents="fresh")
+
+    cp.run(["-r", "-u", "--delete", "src", "dst"], shell)
+    action = shell.undo_stack[-1]
+    assert action["created"] == [str(target / "fresh"), str(target / "fresh" / "new.txt")]
+    assert [original for original, _trash in action["trashed"]] == [
+        str(target / "b.txt"), str(target / "local.txt"), str(target / "stale.txt")]
+
+    message = undo.run([], shell)
+
+    assert message == f"Undo: reverted '{target}' (2 removed, 3 restored)"
+    assert (target / "b.txt").read_text() == "data b.txt"
+    assert (target / "local.txt").read_text() == "keep me"
+    assert (target / "stale.txt").read_text() == "old"
+    assert (target / "a.txt").read_text() == "data a.txt"
+    assert not (target / "fresh").exists()
+    assert list(shell.trash_dir.iterdir()) == []
+
+
+def test_cp_update_failure_still_records_undo(fs, shell, monkeypatch):
+    source, target = _make_synced_tree(fs, shell)
+    (source / "b.txt").write_text("changed")
+    (source / "sub" / "c.txt").write_text("changed too")
+    fs.create_file(str(source / "sub" / "d.txt"), contents="new")
+    original_copy = cp.copy_file
+
+    def failing_copy(source_path, target_path):
+        if str(source_path).endswith("d.txt"):
+            raise OSError("disk full")
+        return original_copy(source_path, target_path)
+
+    monkeypatch.setattr(cp, "copy_file", failing_copy)
+    with pytest.raises(CommandError, match="disk full"):
+        cp.run(["-r", "-u", "src", "dst"], shell)
+    action = shell.undo_stack[-1]
+    assert action["created"] == [str(target / "sub" / "d.txt")]
+    assert [original for original, _trash in action["trashed"]] == [
+        str(target / "b.txt"), str(target / "sub" / "c.txt")]
+
+    undo.run([], shell)
+
+    assert (target / "b.txt").read_text() == "data b.txt"
+    assert (target / "sub" / "c.txt").read_text() == "data sub/c.txt"
+    assert not (target / "sub" / "d.txt").exists()
+    assert list(shell.trash_dir.iterdir()) == []
+
+
+def test_cp_update_moves_aside_file_where_source_has_directory(fs, shell):
+    source, target = _make_synced_tree(fs, shell)
+    (target / "sub" / "c.txt").unlink()
+    (target / "sub").rmdir()
+    fs.create_file(str(target / "sub"), contents="a plain file")
+
+    result = cp.run(["-r", "-u", "src", "dst"], shell)
+
+    assert result.endswith("1 copied, 2 skipped, 14 bytes transferred")
+    assert (target / "sub" / "c.txt").read_text() == "data sub/c.txt"
+    undo.run([], shell)
+    assert (target / "sub").read_text() == "a plain file"
+
+
+@pytest.mark.parametrize(
+    "args",
+    [["--checksum", "a", "b"], ["-r", "--delete", "a", "b"]],
+)
+def test_cp_sync_options_require_update_flag(shell, args):
+    with pytest.raises(CommandError):
+        cp.run(args, shell)
+
+
+def test_cp_delete_requires_directory_source(fs, shell):
+    fs.create_file(str(shell.cwd / "a.txt"), contents="A")
+
+    with pytest.raises(CommandError):
+        cp.run(["-u", "--delete", "a.txt", "b.txt"], shell)
@@ -0,0 +1,108 @@
+import os
+
+import pytest
+
+from src.commands import du
+from src.commands.utils import CommandError
+
+
+def _collect(args, shell):
+    return "".join(du.run(args, shell)).splitlines()
+
+
+def _usage(path):
+    return os.lstat(path).st_blocks * 512
+
+
+@pytest.fixture
+def tree(fs, shell):
+    root = shell.cwd / "data"
+    fs.create_file(str(root / "a.txt"), contents="a" * 5000)
+    fs.create_file(str(root / "docs" / "b.txt"), contents="b" * 3000)
+    fs.create_file(str(root / "docs" / "deep" / "c.txt"), contents="c" * 100)
+    fs.create_dir(str(root / "empty"))
+    return root
+
+
+def test_du_reports_directories_in_post_order(tree, shell):
+    lines = _collect(["data"], shell)
+
+    paths = [line.split("\t")[1] for line in lines]
+    assert paths == ["data/docs/deep", "data/docs", "data/empty", "data"]
+
+    sizes = {line.split("\t")[1]: int(line.split("\t")[0]) for line in lines}
+    deep = _usage(tree / "docs" / "deep") + _usage(tree / "docs" / "deep" / "c.txt")
+    assert sizes["data/docs/deep"] == deep
+    assert sizes["data/docs"] == (
+        deep + _usage(tree / "docs") + _usage(tree / "docs" / "b.txt"))
+    assert sizes["data"] == (
+        sizes["data/docs"] + sizes["data/empty"]
+        + _usage(tree) + _usage(tree / "a.txt"))
+
+
+def test_du_summarize_and_depth_limit(tree, shell):
+    total = _collect(["data"], shell)[-1]
+
+    assert _collect(["-s", "data"], shell) == [total]
+    assert [line.split("\t")[1] for line in _collect(
+        ["--depth", "1", "data"], shell)] == ["data/docs", "data/empty", "data"]
+
+
+def test_du_counts_hardlinks_once(fs, shell):
+    root = shell.cwd / "links"
+    fs.create_file(str(root / "one" / "file.bin"), contents="x" * 8192)
+    os.makedirs(root / "two")
+    os.link(root / "one" / "file.bin", root / "two" / "file.bin")
+
+    lines = _collect(["-s", "links"], shell)
+
+    expected = sum(_usage(root / name) for name in ("", "one", "two"))
+    expected += _usage(root / "one" / "file.bin")
+    assert lines == [f"{expected}\tlinks"]
+
+
+def test_du_human_readable_sizes(fs, shell):
+    fs.create_file(str(shell.cwd / "big.bin"), contents="x" * (3 * 1024 * 1024))
+
+    [line] = _collect(["-h", "big.bin"], shell)
+
+    assert line == "3.0M\tbig.bin"
+
+
+def _age_tree(tree):
+    for directory in (tree / "docs" / "deep", tree / "docs", tree / "empty", tree):
+        os.utime(directory, (1_000_000, 1_000_000))
+
+
+def test_du_reuses_cached_listings(tree, shell):
+    _age_tree(tree)
+    first = _collect(["data"], shell)
+
+    second = _collect(["data"], shell)
+
+    assert second == first
+    assert shell.fs_cache.hit_rates()["listing"] == (4, 4)
+
+
+def test_du_sees_files_growing_in_unchanged_directories(tree, shell):
+    _age_tree(tree)
+    before = _collect(["-s", "data"], shell)
+    old_usage = _usage(tree / "docs" / "b.txt")
+    with open(tree / "docs" / "b.txt", "a") as handle:
+        handle.write("b" * 20_000)
+    os.utime(tree / "docs", (1_000_000, 1_000_000))
+
+    [after] = _collect(["-s", "data"], shell)
+
+    grown = int(after.split("\t")[0]) - int(before[0].split("\t")[0])
+    assert grown == _usage(tree / "docs" / "b.txt") - old_usage
+    assert shell.fs_cache.hit_rates()["listing"][0] == 4
+
+
+def test_du_rejects_bad_arguments(shell):
+    with pytest.raises(CommandError, match="Usage: du"):
+        du.run([], shell)
+    with pytest.raises(CommandError, match="non-negative"):
+        du.run(["--depth", "-1", "."], shell)
+    with pytest.raises(CommandError, match="not found"):
+        du.run(["missing"], shell)
@@ -1,7 +1,19 @@
+import bz2
+import gzip
+import lzma
+import tarfile
+import zipfile
+
 import pytest
 
+from src import config
 from src.commands import grep
 from src.commands.utils import CommandError
+from tests.conftest import ShellStub
+
+
+def _collect(args: list[str], shell) -> str:
+    return "".join(grep.run(args, shell)).rstrip("\n")
 
 
 def test_grep_returns_matching_lines_from_file(fs, shell):
@@ -11,7 +23,7 @@ def test_grep_returns_matching_lines_from_file(fs, shell):
         contents="first line\nsecond line has keyword\nlast line",
     )
 
-    result = grep.run(["keyword", file_path.name], shell)
+    result = _collect(["keyword", file_path.name], shell)
 
     assert result == "notes.txt 2:second line has keyword"
 
@@ -22,7 +34,7 @@ def test_grep_searches_recursively(fs, shell):
     nested = docs / "guide.txt"
     fs.create_file(str(nested), contents="read the manual")
 
-    outcome = grep.run(["-r", "manual", docs.name], shell)
+    outcome = _collect(["-r", "manual", docs.name], shell)
 
     assert outcome == "docs/guide.txt 1:read the manual"
 
@@ -31,16 +43,37 @@ def test_grep_honors_case_insensitive_flag(fs, shell):
     file_path = shell.cwd / "story.txt"
     fs.create_file(str(file_path), contents="Adventure Time")
 
-    response = grep.run(["-i", "adventure", file_path.name], shell)
+    response = _collect(["-i", "adventure", file_path.name], shell)
 
     assert response == "story.txt 1:Adventure Time"
 
 
+def test_grep_anchors_line_end_in_crlf_files(fs, shell):
+    file_path = shell.cwd / "dos.txt"
+    fs.create_file(str(file_path), contents=b"alpha foo\r\nfoo bar\r\nbeta foo\r\n")
+
+    result = _collect(["fo+$", file_path.name], shell)
+
+    assert result == "dos.txt 1:alpha foo\ndos.txt 3:beta foo"
+
+
+@pytest.mark.parametrize("pattern", ["foo", "fo+", "(?=foo)"])
+def test_grep_numbers_lines_by_newline_in_every_searcher(fs, shell, pattern):
+    file_path = shell.cwd / "odd.txt"
+    fs.create_file(str(file_path), contents=b"a\x0cfoo\nbar\rfoo\r\nxfoo\n")
+
+    result = _collect([pattern, file_path.name], shell)
+
+    assert result == (
+        "odd.txt 1:a\x0cfoo\nodd.txt 2:bar\rfoo\nodd.txt 3:xfoo"
+    )
+
+
 def test_grep_reports_absence_of_matches(fs, shell):
     file_path = shell.cwd / "report.txt"
     fs.create_file(str(file_path), contents="all clear")
 
-    message = grep.run(["alert", file_path.name], shell)
+    message = _collect(["alert", file_path.name], shell)
 
     assert message == "no matches found"
 
@@ -80,7 +113,7 @@ def test_grep_recursive_without_path_uses_cwd(fs, shell):
     file_path = shell.cwd / "log.txt"
     fs.create_file(str(file_path), contents="error occurred")
 
-    result = grep.run(["-r", "error"], shell)
+    result = _collect(["-r", "error"], shell)
 
     assert result == "./log.txt 1:error occurred"
 
@@ -91,10 +124,398 @@ def test_grep_combines_recursive_and_ignore_case(fs, shell):
     fs.create_file(str(target_dir / "a.txt"), contents="First KEYword")
     fs.create_file(str(target_dir / "b.txt"), contents="keyword second")
 
-    output = grep.run(["-ri", "keyword", target_dir.name], shell)
+    output = _collect(["-ri", "keyword", target_dir.name], shell)
     lines = sorted(output.splitlines())
 
     assert lines == [
         "src/a.txt 1:First KEYword",
         "src/b.txt 1:keyword second",
     ]
+
+
+def test_grep_parallel_keeps_file_order(fs, shell, monkeypatch):
+    monkeypatch.setattr(config, "GREP_WORKERS", 4)
+    target_dir = shell.cwd / "logs"
+    for index in range(20):
+        fs.create_file(
+            str(target_dir / f"part{index:02d}.log"),
+            contents=f"line\nhit {index}\n",
+        )
+
+    output = _collect(["-r", "hit", target_dir.name], shell)
+
+    assert output.splitlines() == [
+        f"logs/part{index:02d}.log 2:hit {index}" for index in range(20)
+    ]
+
+
+def test_grep_recursive_reports_throughput(fs, shell):
+    fs.create_file(str(shell.cwd / "a.txt"), contents="needle")
+    fs.create_file(str(shell.cwd / "b.txt"), contents="hay")
+
+    _collect(["-r", "needle"], shell)
+
+    assert len(shell.notices) == 1
+    assert "scanned 2 files" in shell.notices[0]
+    assert "files/s" in shell.notices[0]
+    assert "MB/s" in shell.notices[0]
+
+
+def test_grep_streams_matches_lazily(fs, shell):
+    file_path = shell.cwd / "big.txt"
+    fs.create_file(str(file_path), contents="hit one\nhit two\n")
+
+    stream = grep.run(["hit", file_path.name], shell)
+
+    assert next(stream) == "big.txt 1:hit one\n"
+    assert next(stream) == "big.txt 2:hit two\n"
+
+
+def test_grep_caps_output(fs, shell, monkeypatch):
+    monkeypatch.setattr(config, "GREP_MAX_OUTPUT_LINES", 3)
+    file_path = shell.cwd / "flood.txt"
+    fs.create_file(str(file_path), contents="x\n" * 10)
+
+    lines = _collect(["x", file_path.name], shell).splitlines()
+
+    assert len(lines) == 4
+    assert lines[-1] == "grep: output truncated after 3 lines"
+
+
+def test_grep_literal_fast_path_reports_line_numbers(fs, shell):
+    file_path = shell.cwd / "server.log"
+    fs.create_file(
+        str(file_path),
+        contents=b"boot\r\nready\r\nerror: disk\r\nok\r\nerror: net\r\n",
+    )
+
+    result = _collect(["error:", file_path.name], shell)
+
+    assert result.splitlines() == [
+        "server.log 3:error: disk",
+        "server.log 5:error: net",
+    ]
+
+
+def test_grep_literal_ignore_case_uses_original_text(fs, shell):
+    file_path = shell.cwd / "mixed.txt"
+    fs.create_file(str(file_path), contents="alpha\nWARNING here\nwarning")
+
+    result = _collect(["-i", "Warning", file_path.name], shell)
+
+    assert result.splitlines() == [
+        "mixed.txt 2:WARNING here",
+        "mixed.txt 3:warning",
+    ]
+
+
+def test_grep_regex_does_not_match_across_lines(fs, shell):
+    file_path = shell.cwd / "split.txt"
+    fs.create_file(str(file_path), contents="foo\nbar\nfoo bar\n")
+
+    result = _collect([r"foo\sbar", file_path.name], shell)
+
+    assert result == "split.txt 3:foo bar"
+
+
+def test_grep_unicode_ignore_case_regex(fs, shell):
+    file_path = shell.cwd / "ru.txt"
+    fs.create_file(str(file_path), contents="Привет\nпока\n", encoding="utf-8")
+
+    result = _collect(["-i", "ПРИВЕТ", file_path.name], shell)
+
+    assert result == "ru.txt 1:Привет"
+
+
+def test_grep_lookahead_checks_each_line(fs, shell):
+    file_path = shell.cwd / "look.txt"
+    fs.create_file(str(file_path), contents="end\nendless\n")
+
+    result = _collect([r"end(?!\w)", file_path.name], shell)
+
+    assert result == "look.txt 1:end"
+
+
+def test_grep_memory_maps_large_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "GREP_MMAP_THRESHOLD", 1)
+    monkeypatch.setattr(config, "GREP_MMAP_WINDOW", 16)
+    lines = [f"row {index} {'match' if index % 7 == 0 else 'skip'}"
+             for index in range(1, 50)]
+    (tmp_path / "huge.log").write_text("\n".join(lines), encoding="utf-8")
+    stub = ShellStub(cwd=tmp_path, trash_dir=tmp_path / "trash")
+
+    result = "".join(grep.run(["ma.ch", "huge.log"], stub)).splitlines()
+
+    assert result == [
+        f"huge.log {index}:row {index} match" for index in range(7, 50, 7)
+    ]
+
+
+def test_grep_reports_binary_match_once(fs, shell):
+    blob = shell.cwd / "image.bin"
+    fs.create_file(str(blob), contents=b"\x89PNG\x00\x00key\x00key\n")
+
+    result = _collect(["key", blob.name], shell)
+
+    assert result == "Binary file image.bin matches"
+
+
+def test_grep_skips_binary_files_with_capital_i(fs, shell, caplog):
+    fs.create_file(str(shell.cwd / "a.pyc"), contents=b"\x00\xff\xfe token")
+    fs.create_file(str(shell.cwd / "a.py"), contents="token = 1")
+
+    result = _collect(["-rI", "token"], shell)
+
+    assert result == "./a.py 1:token = 1"
+    assert "failed to read" not in caplog.text
+
+
+def test_grep_text_mode_searches_binary_as_bytes(fs, shell):
+    blob = shell.cwd / "dump.bin"
+    fs.create_file(str(blob), contents=b"\x00head\nmagic \xff value\n")
+
+    result = _collect(["-a", "magic", blob.name], shell)
+
+    assert result == "dump.bin 2:magic � value"
+
+
+def test_grep_searches_inside_zip_archive(fs, shell):
+    archive_path = shell.cwd / "logs.zip"
+    with zipfile.ZipFile(archive_path, "w") as zf:
+        zf.writestr("logs/app.log", "start\nfatal error\n")
+        zf.writestr("logs/db.log", "ok\n")
+        zf.writestr("../escape.log", "fatal escape\n")
+
+    result = _collect(["fatal", archive_path.name], shell)
+
+    assert result == "logs.zip:logs/app.log 2:fatal error"
+
+
+def test_grep_searches_tar_and_gzip_members(fs, shell):
+    source = shell.cwd / "src.txt"
+    fs.create_file(str(source), contents="alpha\nneedle in tar\n")
+    with tarfile.open(shell.cwd / "bundle.tgz", "w:gz") as tf:
+        tf.add(source, arcname="data/src.txt")
+    with gzip.open(shell.cwd / "rotated.log.gz", "wb") as handle:
+        handle.write(b"needle in gzip\n")
+    source.unlink()
+
+    lines = _collect(["-rz", "needle"], shell).splitlines()
+
+    assert lines == [
+        "./bundle.tgz:data/src.txt 2:needle in tar",
+        "./rotated.log.gz:rotated.log 1:needle in gzip",
+    ]
+
+
+def test_grep_decompresses_single_file_formats_without_z(fs, shell):
+    fs.create_file(
+        str(shell.cwd / "app.log.gz"), contents=gzip.compress(b"ok\nneedle gz\n"))
+    fs.create_file(
+        str(shell.cwd / "app.log.bz2"), contents=bz2.compress(b"needle bz2\n"))
+    fs.create_file(
+        str(shell.cwd / "app.log.xz"), contents=lzma.compress(b"x\nneedle xz\n"))
+
+    lines = _collect(["-r", "needle"], shell).splitlines()
+
+    assert lines == [
+        "./app.log.bz2 1:needle bz2",
+        "./app.log.gz 2:needle gz",
+        "./app.log.xz 2:needle xz",
+    ]
+
+
+def _make_tree(fs, shell) -> None:
+    fs.create_file(str(shell.cwd / "a.log"), contents="ok\nfail 1\nfail 2\n")
+    fs.create_file(str(shell.cwd / "b.log"), contents="fine\n")
+    fs.create_file(str(shell.cwd / "c.log"), contents="fail 3\n")
+
+
+def test_grep_lists_matching_files(fs, shell):
+    _make_tree(fs, shell)
+
+    assert _collect(["-rl", "fail"], shell).splitlines() == ["./a.log", "./c.log"]
+
+
+def test_grep_counts_matching_lines(fs, shell):
+    _make_tree(fs, shell)
+
+    assert _collect(["-rc", "fail"], shell).splitlines() == [
+        "./a.log:2",
+        "./c.log:1",
+    ]
+
+
+def test_grep_stops_after_max_count(fs, shell):
+    _make_tree(fs, shell)
+
+    assert _collect(["-r", "-m", "1", "fail"], shell).splitlines() == [
+        "./a.log 2:fail 1",
+        "./c.log 1:fail 3",
+    ]
+    assert _collect(["-rm1", "-c", "fail"], shell).splitlines() == [
+        "./a.log:1",
+        "./c.log:1",
+    ]
+
+
+def test_grep_quiet_stops_at_first_match(fs, shell, monkeypatch):
+    _make_tree(fs, shell)
+    scanned = []
+    real_scan = grep._scan_file
+
+    def tracking_scan(file_path, searcher, options):
+        scanned.append(file_path.name)
+        return real_scan(file_path, searcher, options)
+
+    monkeypatch.setattr(config, "GREP_WORKERS", 1)
+    monkeypatch.setattr(grep, "_scan_file", tracking_scan)
+
+    assert _collect(["-rq", "fail"], shell) == ""
+    assert scanned == ["a.log"]
+    assert _collect(["-rq", "absent"], shell) == "no matches found"
+
+
+def test_grep_rejects_invalid_max_count(shell):
+    with pytest.raises(CommandError):
+        grep.run(["-m", "many", "x", "file"], shell)
+    with pytest.raises(CommandError):
+        grep.run(["-r", "-m"], shell)
+
+
+def test_grep_matches_several_literals_in_one_pass(fs, shell):
+    file_path = shell.cwd / "orders.csv"
+    fs.create_file(
+        str(file_path),
+        contents="id-100,ok\nid-1001,late\nid-200,ok\nid-300,lost\n",
+    )
+
+    result = _collect(
+        ["-e", "id-100", "-e", "id-1001", "-e", "id-300", file_path.name],
+        shell,
+    )
+
+    assert result.splitlines() == [
+        "orders.csv 1 [id-100]:id-100,ok",
+        "orders.csv 2 [id-1001]:id-1001,late",
+        "orders.csv 4 [id-300]:id-300,lost",
+    ]
+
+
+def test_grep_reads_patterns_from_file(fs, shell):
+    fs.create_file(str(shell.cwd / "ids.txt"), contents="ALPHA\n\nbeta\n")
+    fs.create_file(str(shell.cwd / "data.txt"), contents="alpha\nBeta\ngamma\n")
+
+    result = _collect(["-i", "-f", "ids.txt", "data.txt"], shell)
+
+    assert result.splitlines() == [
+        "data.txt 1 [ALPHA]:alpha",
+        "data.txt 2 [beta]:Beta",
+    ]
+
+
+def test_grep_combines_regex_patterns(fs, shell):
+    file_path = shell.cwd / "app.log"
+    fs.create_file(str(file_path), contents="code 404\nuser=bob\nfine\n")
+
+    result = _collect([r"-e\d{3}", "-e", "user=\\w+", file_path.name], shell)
+
+    assert result.splitlines() == [
+        "app.log 1 [\\d{3}]:code 404",
+        "app.log 2 [user=\\w+]:user=bob",
+    ]
+
+
+def test_grep_trie_pattern_shares_prefixes():
+    pattern = grep._trie_pattern(["tea", "ten", "to"])
+
+    assert pattern == "t(?:e(?:a|n)|o)"
+
+
+def test_grep_handles_long_and_deeply_nested_literal_sets(fs, shell):
+    long_literal = "x" * 5000
+    prefixes = ["y" * length for length in range(1, 300)]
+    fs.create_file(
+        str(shell.cwd / "data.txt"),
+        contents=f"{long_literal}\nyyy\nz\n",
+    )
+    fs.create_file(
+        str(shell.cwd / "ids.txt"), contents="\n".join([long_literal, "q"]))
+    fs.create_file(str(shell.cwd / "prefixes.txt"), contents="\n".join(prefixes))
+
+    assert _collect(["-c", "-f", "ids.txt", "data.txt"], shell) == "data.txt:1"
+    assert "|" in grep._trie_pattern(prefixes)
+    result = _collect(["-f", "prefixes.txt", "data.txt"], shell)
+    assert result == "data.txt 2 [yyy]:yyy"
+
+
+def test_grep_rejects_missing_pattern_file(shell):
+    with pytest.raises(CommandError):
+        grep.run(["-f", "absent.txt", "-r"], shell)
+
+
+def test_grep_prints_context_with_separators(fs, shell):
+    file_path = shell.cwd / "ctx.txt"
+    lines = ["l1", "l2", "hit a", "l4", "l5", "l6", "l7", "hit b", "l9", "hit c"]
+    fs.create_file(str(file_path), contents="\n".join(lines))
+
+    result = _collect(["-C", "1", "hit", file_path.name], shell)
+
+    assert result.splitlines() == [
+        "ctx.txt 2-l2",
+        "ctx.txt 3:hit a",
+        "ctx.txt 4-l4",
+        "--",
+        "ctx.txt 7-l7",
+        "ctx.txt 8:hit b",
+        "ctx.txt 9-l9",
+        "ctx.txt 10:hit c",
+    ]
+
+
+def test_grep_before_and_after_context_are_independent(fs, shell):
+    file_path = shell.cwd / "ctx.txt"
+    fs.create_file(str(file_path), contents="a\nb\nc\nhit\nd\ne\n")
+
+    assert _collect(["-B2", "hit", file_path.name], shell).splitlines() == [
+        "ctx.txt 2-b",
+        "ctx.txt 3-c",
+        "ctx.txt 4:hit",
+    ]
+    assert _collect(["-A", "1", "hit", file_path.name], shell).splitlines() == [
+        "ctx.txt 4:hit",
+        "ctx.txt 5-d",
+    ]
+
+
+def test_grep_context_separates_files(fs, shell):
+    fs.create_file(str(shell.cwd / "a.txt"), contents="x\nhit\n")
+    fs.create_file(str(shell.cwd / "b.txt"), contents="hit\ny\n")
+
+    result = _collect(["-r", "-C1", "hit"], shell)
+
+    assert result.splitlines() == [
+        "./a.txt 1-x",
+        "./a.txt 2:hit",
+        "--",
+        "./b.txt 1:hit",
+        "./b.txt 2-y",
+    ]
+
+
+def test_grep_context_keeps_bounded_buffer(fs, shell):
+    file_path = shell.cwd / "long.txt"
+    fs.create_file(
+        str(file_path), contents="".join(f"row {n}\n" for n in range(5000))
+    )
+    options = {
+        "line_matcher": lambda raw: raw == b"row 4999",
+        "max_count": None,
+        "before": 3,
+        "after": 0,
+    }
+
+    lines = (f"row {n}".encode() for n in range(5000))
+    entries = list(grep._context_lines(lines, options))
+
+    assert [lineno for lineno, _, _ in entries] == [4997, 4998, 4999, 5000]
@@ -0,0 +1,65 @@
+import gzip
+
+import pytest
+
+from src import config
+from src.commands import head
+from src.commands.utils import CommandError
+
+
+def _collect(args, shell):
+    return "".join(head.run(args, shell))
+
+
+def test_head_prints_first_ten_lines_by_default(fs, shell):
+    lines = [f"line {number}" for number in range(1, 21)]
+    fs.create_file(str(shell.cwd / "log.txt"), contents="\n".join(lines))
+
+    result = _collect(["log.txt"], shell)
+
+    assert result.splitlines() == lines[:10]
+    assert result.endswith("line 10\n")
+
+
+def test_head_stops_reading_after_requested_lines(fs, shell, monkeypatch):
+    monkeypatch.setattr(config, "CAT_CHUNK_SIZE", 8)
+    fs.create_file(str(shell.cwd / "log.txt"), contents="a\nbb\nccc\n" + "x" * 1000)
+    reads = []
+    original = head.read_chunks
+
+    def counting(handle, size):
+        for chunk in original(handle, size):
+            reads.append(chunk)
+            yield chunk
+
+    monkeypatch.setattr(head, "read_chunks", counting)
+
+    assert _collect(["-n", "2", "log.txt"], shell) == "a\nbb\n"
+    assert len(reads) == 1
+
+
+def test_head_accepts_attached_count_and_zero(fs, shell):
+    fs.create_file(str(shell.cwd / "log.txt"), contents="one\ntwo\nthree")
+
+    assert _collect(["-n3", "log.txt"], shell) == "one\ntwo\nthree"
+    assert _collect(["-n", "0", "log.txt"], shell) == ""
+
+
+def test_head_rejects_bad_arguments(fs, shell):
+    fs.create_dir(str(shell.cwd / "docs"))
+
+    with pytest.raises(CommandError, match="Usage: head"):
+        head.run([], shell)
+    with pytest.raises(CommandError, match="non-negative"):
+        head.run(["-n", "x", "file"], shell)
+    with pytest.raises(CommandError, match="unsupported option"):
+        head.run(["-q", "file"], shell)
+    with pytest.raises(CommandError, match="must be a file"):
+        head.run(["docs"], shell)
+
+
+def test_head_reads_gzip_files(fs, shell):
+    body = "".join(f"entry {number}\n" for number in range(1000))
+    fs.create_file(str(shell.cwd / "log.gz"), contents=gzip.compress(body.encode()))
+
+    assert _collect(["-n", "2", "log.gz"], shell) == "entry 0\nentry 1\n"
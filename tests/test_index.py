@@ -0,0 +1,181 @@
+import gzip
+import json
+from pathlib import Path
+
+import pytest
+
+from src import config
+from src.commands import grep, index
+from src.commands.utils import CommandError
+
+
+@pytest.fixture(autouse=True)
+def index_dir(monkeypatch):
+    monkeypatch.setattr(config, "INDEX_DIR", Path("/home/tester/.index"))
+
+
+def _grep(args: list[str], shell) -> list[str]:
+    return "".join(grep.run(args, shell)).splitlines()
+
+
+def test_index_builds_entries_for_directory(fs, shell):
+    fs.create_file(str(shell.cwd / "src" / "a.py"), contents="import os")
+    fs.create_file(str(shell.cwd / "src" / "b.py"), contents="print(1)")
+
+    message = index.run(["src"], shell)
+
+    state = index.load_index(shell.cwd / "src")
+    assert sorted(state["files"]) == ["a.py", "b.py"]
+    assert message == (
+        f"Indexed '{shell.cwd / 'src'}': 2 files (2 updated, 0 removed)"
+    )
+
+
+def test_index_is_incremental(fs, shell):
+    fs.create_file(str(shell.cwd / "a.txt"), contents="alpha")
+    fs.create_file(str(shell.cwd / "b.txt"), contents="beta")
+    index.run([], shell)
+    (shell.cwd / "b.txt").unlink()
+
+    message = index.run([], shell)
+
+    assert message.endswith("1 files (0 updated, 1 removed)")
+
+
+def test_grep_uses_index_to_skip_files(fs, shell):
+    fs.create_file(str(shell.cwd / "hit.log"), contents="disk failure")
+    fs.create_file(str(shell.cwd / "miss.log"), contents="all good")
+    index.run([], shell)
+
+    lines = _grep(["-r", "failure"], shell)
+
+    assert lines == ["./hit.log 1:disk failure"]
+    assert "grep: index narrowed search to 1 of 2 files" in shell.notices
+
+
+def test_index_keeps_postings_of_unchanged_files(fs, shell):
+    fs.create_file(str(shell.cwd / "a.txt"), contents="disk failure")
+    fs.create_file(str(shell.cwd / "b.txt"), contents="all good")
+    fs.create_file(str(shell.cwd / "c.txt"), contents="fan failure")
+    index.run([], shell)
+    (shell.cwd / "a.txt").unlink()
+    (shell.cwd / "b.txt").write_text("power failure", encoding="utf-8")
+
+    message = index.run([], shell)
+    lines = _grep(["-r", "failure"], shell)
+
+    assert message.endswith("2 files (1 updated, 1 removed)")
+    assert lines == ["./b.txt 1:power failure", "./c.txt 1:fan failure"]
+    assert "grep: index narrowed search to 2 of 2 files" in shell.notices
+    assert _grep(["-r", "disk"], shell) == ["no matches found"]
+    assert "grep: index narrowed search to 0 of 2 files" in shell.notices
+
+
+def test_grep_ignores_postings_of_another_generation(fs, shell):
+    fs.create_file(str(shell.cwd / "a.txt"), contents="needle here")
+    index.run([], shell)
+    state = index.load_index(shell.cwd)
+    state["generation"] += 1
+    index.index_file_for(shell.cwd).write_text(json.dumps(state))
+
+    lines = _grep(["-r", "needle"], shell)
+
+    assert lines == ["./a.txt 1:needle here"]
+    assert not any("index" in notice for notice in shell.notices)
+
+
+def test_index_keeps_binary_files_as_candidates(fs, shell):
+    fs.create_file(str(shell.cwd / "blob.bin"), contents=b"\0\1failure\2")
+    fs.create_file(str(shell.cwd / "miss.log"), contents="all good")
+    index.run([], shell)
+
+    lines = _grep(["-r", "failure"], shell)
+
+    assert index.load_index(shell.cwd)["files"]["blob.bin"][2] is None
+    assert lines == ["Binary file ./blob.bin matches"]
+    assert "grep: index narrowed search to 1 of 2 files" in shell.notices
+
+
+def test_index_keeps_compressed_files_as_candidates(fs, shell):
+    fs.create_file(
+        str(shell.cwd / "old.log.gz"), contents=gzip.compress(b"disk failure\n"))
+    fs.create_file(str(shell.cwd / "miss.log"), contents="all good")
+    index.run([], shell)
+
+    lines = _grep(["-r", "failure"], shell)
+
+    assert lines == ["./old.log.gz 1:disk failure"]
+    assert "grep: index narrowed search to 1 of 2 files" in shell.notices
+
+
+def test_grep_keeps_modified_files_as_candidates(fs, shell):
+    path = shell.cwd / "notes.txt"
+    fs.create_file(str(path), contents="nothing yet")
+    index.run([], shell)
+    path.write_text("a new keyword appears", encoding="utf-8")
+
+    lines = _grep(["-r", "keyword"], shell)
+
+    assert lines == ["./notes.txt 1:a new keyword appears"]
+    assert "grep: index narrowed search to 1 of 1 files" in shell.notices
+    assert index.load_index(shell.cwd)["files"]["notes.txt"][1] == 11
+
+
+def test_grep_without_index_scans_everything(fs, shell):
+    fs.create_file(str(shell.cwd / "a.txt"), contents="needle here")
+
+    lines = _grep(["-r", "needle"], shell)
+
+    assert lines == ["./a.txt 1:needle here"]
+    assert not any("index" in notice for notice in shell.notices)
+
+
+def test_query_trigrams_skip_optional_parts():
+    assert index.query_trigrams(r"err(or)?\d+x{2}abc", False) == [b"abc", b"err"]
+    assert index.query_trigrams("foo|bar", False) == []
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    [r"foo\tbar", r"\x66oo\x09bar", r"foo\u0009bar", r"\N{LATIN SMALL LETTER F}oo\tbar"],
+)
+def test_grep_with_index_decodes_escapes_in_patterns(fs, shell, pattern):
+    fs.create_file(str(shell.cwd / "tabs.txt"), contents="foo\tbar")
+    fs.create_file(str(shell.cwd / "other.txt"), contents="nothing here")
+    index.run([], shell)
+
+    assert _grep(["-r", pattern], shell) == ["./tabs.txt 1:foo\tbar"]
+    assert "grep: index narrowed search to 1 of 2 files" in shell.notices
+
+
+def test_query_trigrams_break_runs_on_class_escapes():
+    assert index.query_trigrams(r"abc\bxyz\d42q", False) == [
+        b"42q", b"abc", b"xyz"]
+
+
+@pytest.mark.parametrize(
+    ("pattern", "expected"),
+    [
+        (r"[\]abc]xyz", [b"xyz"]),
+        (r"[]abc]xyz", [b"xyz"]),
+        (r"[^]abc]xyz", [b"xyz"]),
+        (r"[a\\]def", [b"def"]),
+    ],
+)
+def test_query_trigrams_skip_whole_character_classes(pattern, expected):
+    assert index.query_trigrams(pattern, False) == expected
+
+
+def test_grep_with_index_matches_escaped_bracket_in_class(fs, shell):
+    fs.create_file(str(shell.cwd / "hit.txt"), contents="bxyz")
+    fs.create_file(str(shell.cwd / "miss.txt"), contents="nothing")
+    index.run([], shell)
+
+    assert _grep(["-r", r"[\]abc]xyz"], shell) == ["./hit.txt 1:bxyz"]
+
+
+def test_index_rejects_file_target(fs, shell):
+    fs.create_file(str(shell.cwd / "single.txt"), contents="x")
+
+    with pytest.raises(CommandError):
+        index.run(["single.txt"], shell)
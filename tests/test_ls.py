@@ -2,6 +2,7 @@ from datetime import datetime
 
 import pytest
 
+from src import config
 from src.commands import ls
 from src.commands.utils import CommandError
 
@@ -56,3 +57,153 @@ def test_ls_adds_headers_for_multiple_targets(fs, shell):
 
     assert any(line.startswith(f"{first.name}:") for line in sections)
     assert any(line.startswith(f"{second.name}:") for line in sections)
+
+
+def test_ls_long_format_stats_each_entry_once(fs, shell, monkeypatch):
+    fs.create_file(str(shell.cwd / "a.txt"), contents="A")
+    fs.create_file(str(shell.cwd / "b.txt"), contents="BB")
+
+    def fail(*_args, **_kwargs):
+        raise AssertionError("per-entry Path call")
+
+    monkeypatch.setattr(ls.Path, "lstat", fail)
+    monkeypatch.setattr(ls.Path, "is_symlink", fail)
+
+    lines = ls.run(["-l"], shell).splitlines()
+
+    assert [line.split()[-1] for line in lines] == ["a.txt", "b.txt"]
+    assert [line.split()[1] for line in lines] == ["1", "2"]
+
+
+def test_ls_long_format_shows_symlink_target(fs, shell):
+    fs.create_file(str(shell.cwd / "data.txt"), contents="data")
+    fs.create_symlink(str(shell.cwd / "link"), "data.txt")
+
+    lines = ls.run(["-l"], shell).splitlines()
+
+    assert lines[1].startswith("l")
+    assert lines[1].endswith("link -> data.txt")
+
+
+def test_ls_recursive_streams_sections_depth_first(fs, shell):
+    fs.create_file(str(shell.cwd / "top.txt"), contents="T")
+    fs.create_file(str(shell.cwd / "alpha" / "one.txt"), contents="1")
+    fs.create_file(str(shell.cwd / "alpha" / "deep" / "two.txt"), contents="2")
+    fs.create_dir(str(shell.cwd / "beta"))
+
+    result = ls.run(["-R"], shell)
+
+    assert not isinstance(result, str)
+    assert "".join(result).split("\n\n") == [
+        ".:\nalpha\nbeta\ntop.txt",
+        "./alpha:\ndeep\none.txt",
+        "./alpha/deep:\ntwo.txt",
+        "./beta:\n",
+    ]
+
+
+def test_ls_long_recursive_formats_every_section(fs, shell):
+    fs.create_file(str(shell.cwd / "docs" / "a.txt"), contents="abc")
+    fs.create_file(str(shell.cwd / "docs" / "sub" / "b.txt"), contents="bb")
+    fs.create_symlink(str(shell.cwd / "docs" / "loop"), str(shell.cwd / "docs"))
+
+    sections = "".join(ls.run(["-lR", "docs"], shell)).split("\n\n")
+
+    assert len(sections) == 2
+    top = sections[0].splitlines()
+    assert top[0] == "docs:"
+    assert top[1].split()[1] == "3"
+    assert top[2].endswith("loop -> /home/tester/workspace/docs")
+    header, line = sections[1].splitlines()
+    assert header == "docs/sub:"
+    assert line.split()[1] == "2"
+
+
+def test_ls_recursive_reports_unreadable_directory(fs, shell, monkeypatch):
+    fs.create_file(str(shell.cwd / "open" / "a.txt"), contents="A")
+    fs.create_file(str(shell.cwd / "secret" / "b.txt"), contents="B")
+    scan = ls._scan_entries
+
+    def guarded(path, options):
+        if path.name == "secret":
+            raise CommandError(f"ls: cannot open directory '{path}': denied")
+        return scan(path, options)
+
+    monkeypatch.setattr(ls, "_scan_entries", guarded)
+
+    output = "".join(ls.run(["-R"], shell))
+
+    assert output.endswith("./secret:\n")
+    assert "./open:\na.txt" in output
+    assert shell.notices == [
+        f"ls: cannot open directory '{shell.cwd / 'secret'}': denied"
+    ]
+
+
+def test_ls_accepts_combined_flags_only_when_known(shell):
+    with pytest.raises(CommandError, match="unsupported option '-lx'"):
+        ls.run(["-lx"], shell)
+
+
+def _make_sized_files(fs, directory):
+    for name, size, day in (("small", 1, 3), ("large", 30, 1), ("medium", 10, 2)):
+        path = directory / f"{name}.txt"
+        fs.create_file(str(path), contents="x" * size)
+        timestamp = datetime(2024, 1, day, 12, 0).timestamp()
+        fs.utime(str(path), (timestamp, timestamp))
+
+
+def test_ls_sorts_by_size_and_time(fs, shell):
+    _make_sized_files(fs, shell.cwd)
+
+    assert ls.run(["-S"], shell).splitlines() == [
+        "large.txt", "medium.txt", "small.txt"]
+    assert ls.run(["-t"], shell).splitlines() == [
+        "small.txt", "medium.txt", "large.txt"]
+    assert ls.run(["-Sr"], shell).splitlines() == [
+        "small.txt", "medium.txt", "large.txt"]
+    assert ls.run(["-r"], shell).splitlines() == [
+        "small.txt", "medium.txt", "large.txt"]
+
+
+def test_ls_stats_large_directory_in_parallel_batches(fs, shell, monkeypatch):
+    for number in range(9):
+        fs.create_file(str(shell.cwd / f"f{number}.txt"), contents="x" * number)
+    monkeypatch.setattr(config, "LS_STAT_BATCH", 2)
+    monkeypatch.setattr(config, "LS_STAT_WORKERS", 4)
+    batches: list[list[str]] = []
+    stat_batch = ls._stat_batch
+
+    def record(entries):
+        batches.append([entry.name for entry in entries])
+        return stat_batch(entries)
+
+    monkeypatch.setattr(ls, "_stat_batch", record)
+
+    lines = ls.run(["-lS"], shell).splitlines()
+
+    assert [line.split()[-1] for line in lines] == [
+        f"f{number}.txt" for number in reversed(range(9))]
+    assert sorted(len(names) for names in batches) == [1, 2, 2, 2, 2]
+
+
+def test_ls_top_selects_with_bounded_heap(fs, shell, monkeypatch):
+    _make_sized_files(fs, shell.cwd)
+
+    def fail(*_args, **_kwargs):
+        raise AssertionError("full sort used for --top")
+
+    monkeypatch.setattr(ls, "sorted", fail, raising=False)
+
+    assert ls.run(["-S", "--top", "2"], shell).splitlines() == [
+        "large.txt", "medium.txt"]
+    assert ls.run(["-t", "-r", "--top=1"], shell).splitlines() == ["large.txt"]
+    long_lines = ls.run(["-lS", "--top", "1"], shell).splitlines()
+    assert long_lines[0].split()[1] == "30"
+
+
+def test_ls_top_requires_positive_integer(shell):
+    with pytest.raises(CommandError, match="--top requires"):
+        ls.run(["--top", "0"], shell)
+    with pytest.raises(CommandError, match="Usage: ls"):
+        ls.run(["--top"], shell)
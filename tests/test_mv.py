@@ -1,7 +1,11 @@
+import errno
+import os
+
 import pytest
 
-from src.commands import mv
+from src.commands import mv, utils
 from src.commands.utils import CommandError
+from tests.conftest import ShellStub
 
 
 def test_mv_renames_file(fs, shell):
@@ -37,3 +41,27 @@ def test_mv_moves_into_directory(fs, shell):
 def test_mv_fails_when_source_missing(shell):
     with pytest.raises(CommandError):
         mv.run(["absent.txt", "new.txt"], shell)
+
+
+@pytest.mark.skipif(not hasattr(os, "SEEK_DATA"), reason="SEEK_DATA is unavailable")
+def test_mv_across_devices_keeps_holes(tmp_path, monkeypatch):
+    def cross_device(source, destination):
+        raise OSError(errno.EXDEV, "cross-device link")
+
+    size = 32 * 1024 * 1024
+    with open(tmp_path / "disk.img", "wb") as handle:
+        handle.truncate(size)
+        handle.write(b"data")
+    if os.stat(tmp_path / "disk.img").st_blocks * 512 >= size:
+        pytest.skip("filesystem does not support sparse files")
+    monkeypatch.setattr(os, "rename", cross_device)
+    monkeypatch.setattr(utils, "_reflink", lambda source, target: False)
+    stub = ShellStub(cwd=tmp_path, trash_dir=tmp_path / "trash")
+
+    mv.run(["disk.img", "moved.img"], stub)
+
+    moved = tmp_path / "moved.img"
+    assert not (tmp_path / "disk.img").exists()
+    assert moved.stat().st_size == size
+    assert moved.stat().st_blocks * 512 < size // 4
+    assert moved.read_bytes()[:4] == b"data"
@@ -104,3 +104,30 @@ def test_shell_logs_error_on_unknown_command(configured_shell, monkeypatch):
     log_content = Path(config.LOG_FILE).read_text(encoding="utf-8")
     assert "unknown_command" in log_content
     assert "ERROR:" in log_content
+
+
+def test_shell_prints_notices_after_result(configured_shell, monkeypatch):
+    printed = []
+    monkeypatch.setattr(configured_shell, "_echo_success", printed.append)
+    monkeypatch.setattr(configured_shell, "_echo_info", printed.append)
+
+    def handler(args: list[str], shell) -> str:
+        shell.notify("stats")
+        return "result"
+
+    configured_shell.register_command("probe", handler)
+    configured_shell._handle_command("probe")
+
+    assert printed == ["result", "stats"]
+    assert configured_shell.notices == []
+
+
+def test_shell_streams_iterable_results(configured_shell, capsys):
+    def handler(args: list[str], shell):
+        yield "first\n"
+        yield "second"
+
+    configured_shell.register_command("stream", handler)
+    configured_shell._handle_command("stream")
+
+    assert capsys.readouterr().out == "first\nsecond\n"
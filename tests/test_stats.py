@@ -0,0 +1,59 @@
+import os
+import re
+
+import pytest
+
+from src.commands import grep, ls, stats
+from src.commands.utils import CommandError, compile_pattern
+
+
+@pytest.fixture(autouse=True)
+def clear_regex_cache():
+    compile_pattern.cache_clear()
+    yield
+    compile_pattern.cache_clear()
+
+
+def test_compile_pattern_reuses_compiled_objects():
+    first = compile_pattern(r"err\w+", re.IGNORECASE)
+    second = compile_pattern(r"err\w+", re.IGNORECASE)
+    other = compile_pattern(r"err\w+")
+
+    assert first is second
+    assert other is not first
+    info = compile_pattern.cache_info()
+    assert (info.hits, info.misses) == (1, 2)
+
+
+def test_stats_reports_regex_cache_counters(fs, shell):
+    fs.create_file("/home/tester/workspace/notes.txt", contents="alpha\nbeta\n")
+
+    for _ in range(3):
+        "".join(grep.run([r"al\w+", "notes.txt"], shell))
+
+    result = stats.run([], shell).splitlines()
+    info = compile_pattern.cache_info()
+    assert info.hits > 0
+    assert result[0] == (
+        f"regex cache: {info.hits} hits, {info.misses} misses, "
+        f"{info.currsize}/{info.maxsize} entries"
+    )
+
+
+def test_stats_reports_metadata_cache_hit_rates(fs, shell):
+    workspace = str(shell.cwd)
+    fs.create_file(f"{workspace}/notes.txt", contents="alpha\n")
+    os.utime(workspace, (1_000_000, 1_000_000))
+
+    for _ in range(4):
+        ls.run([], shell)
+
+    lines = stats.run([], shell).splitlines()
+
+    assert "metadata cache (listing): 3 hits, 1 misses, 75% hit rate" in lines
+    assert "metadata cache (lookup): 0 hits, 0 misses, n/a hit rate" in lines
+
+
+def test_stats_rejects_arguments(shell):
+    with pytest.raises(CommandError, match="Usage: stats"):
+        stats.run(["extra"], shell)
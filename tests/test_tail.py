@@ -0,0 +1,81 @@
+import pytest
+
+from src import config
+from src.commands import tail
+from src.commands.utils import CommandError
+
+
+def _collect(args, shell):
+    return "".join(tail.run(args, shell))
+
+
+def test_tail_prints_last_lines(fs, shell):
+    lines = [f"line {number}" for number in range(1, 21)]
+    fs.create_file(str(shell.cwd / "log.txt"), contents="\n".join(lines) + "\n")
+
+    assert _collect(["log.txt"], shell).splitlines() == lines[-10:]
+    assert _collect(["-n", "1", "log.txt"], shell) == "line 20\n"
+    assert _collect(["-n", "0", "log.txt"], shell) == ""
+    assert _collect(["-n", "50", "log.txt"], shell).splitlines() == lines
+
+
+def test_tail_without_trailing_newline(fs, shell):
+    fs.create_file(str(shell.cwd / "log.txt"), contents="a\nb\nc")
+
+    assert _collect(["-n", "2", "log.txt"], shell) == "b\nc"
+
+
+def test_tail_reads_only_blocks_near_the_end(fs, shell, monkeypatch):
+    monkeypatch.setattr(config, "TAIL_BLOCK_SIZE", 16)
+    body = "".join(f"{number:07d}\n" for number in range(10_000))
+    path = shell.cwd / "big.log"
+    fs.create_file(str(path), contents=body)
+    sizes = []
+
+    with path.open("rb") as handle:
+        read = handle.read
+
+        class Spy:
+            def __getattr__(self, name):
+                return getattr(handle, name)
+
+            def read(self, size=-1):
+                data = read(size)
+                sizes.append(len(data))
+                return data
+
+        offset = tail._tail_offset(Spy(), len(body), 3)
+
+    assert body[offset:] == "0009997\n0009998\n0009999\n"
+    assert sum(sizes) <= 32
+
+
+def test_tail_follow_streams_appended_data(fs, shell, monkeypatch):
+    path = shell.cwd / "app.log"
+    fs.create_file(str(path), contents="old 1\nold 2\n")
+    sleeps = []
+
+    def fake_sleep(delay):
+        sleeps.append(delay)
+        if len(sleeps) == 1:
+            with path.open("a") as handle:
+                handle.write("new 1\n")
+        elif len(sleeps) == 2:
+            with path.open("w") as handle:
+                handle.write("reset\n")
+        else:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(tail.time, "sleep", fake_sleep)
+
+    output = _collect(["-f", "-n", "1", "app.log"], shell)
+
+    assert output == "old 2\nnew 1\nreset\n"
+    assert sleeps[0] == config.TAIL_POLL_MIN
+
+
+def test_tail_rejects_bad_arguments(shell):
+    with pytest.raises(CommandError, match="Usage: tail"):
+        tail.run(["-f"], shell)
+    with pytest.raises(CommandError, match="not found"):
+        tail.run(["missing.log"], shell)
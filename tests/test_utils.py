@@ -1,6 +1,13 @@
+import errno
+import os
+import shutil
+import sys
 from pathlib import Path
 
-from src.commands.utils import resolve_path
+import pytest
+
+from src.commands import utils
+from src.commands.utils import MetadataCache, copy_file, resolve_path, walk_tree
 
 
 def test_resolve_path_handles_home(monkeypatch):
@@ -24,3 +31,277 @@ def test_resolve_path_preserves_absolute_path():
     absolute = Path("/data/output.txt")
 
     assert resolve_path(str(absolute), cwd) == absolute.resolve()
+
+
+def _walked(root: Path, **kwargs) -> list[str]:
+    return [
+        Path(entry.path).relative_to(root).as_posix()
+        for entry in walk_tree(root, **kwargs)
+    ]
+
+
+def test_walk_tree_yields_files_in_name_order(fs):
+    root = Path("/data")
+    fs.create_file(str(root / "b.txt"))
+    fs.create_file(str(root / "a" / "z.txt"))
+    fs.create_file(str(root / "a.txt"))
+
+    assert _walked(root) == ["a/z.txt", "a.txt", "b.txt"]
+
+
+def test_walk_tree_prunes_directories_before_descending(fs, monkeypatch):
+    root = Path("/data")
+    fs.create_file(str(root / ".git" / "HEAD"))
+    fs.create_file(str(root / ".trash" / "old.txt"))
+    fs.create_file(str(root / "keep.txt"))
+    visited = []
+    real_scandir = os.scandir
+
+    def tracking_scandir(path):
+        visited.append(Path(path).name)
+        return real_scandir(path)
+
+    monkeypatch.setattr(os, "scandir", tracking_scandir)
+
+    assert _walked(root, prune={".git", ".trash"}) == ["keep.txt"]
+    assert visited == ["data"]
+
+
+def test_walk_tree_honours_ignore_file(fs):
+    root = Path("/data")
+    fs.create_file(str(root / ".gitignore"), contents="*.log\nbuild/\n")
+    fs.create_file(str(root / "app.py"))
+    fs.create_file(str(root / "debug.log"))
+    fs.create_file(str(root / "build" / "out.py"))
+    fs.create_file(str(root / "pkg" / "trace.log"))
+
+    walked = _walked(root, ignore_file=".gitignore")
+
+    assert walked == [".gitignore", "app.py"]
+
+
+def test_walk_tree_anchors_ignore_rules_with_leading_slash(fs):
+    root = Path("/data")
+    fs.create_file(str(root / ".gitignore"), contents="/build\n")
+    fs.create_file(str(root / "build" / "out.py"))
+    fs.create_file(str(root / "sub" / "build" / "kept.py"))
+    fs.create_file(str(root / "sub" / ".gitignore"), contents="/tmp/\n")
+    fs.create_file(str(root / "sub" / "tmp" / "scratch.py"))
+    fs.create_file(str(root / "tmp" / "kept.py"))
+
+    walked = _walked(root, ignore_file=".gitignore")
+
+    assert walked == [
+        ".gitignore",
+        "sub/.gitignore",
+        "sub/build/kept.py",
+        "tmp/kept.py",
+    ]
+
+
+def test_walk_tree_can_include_directories(fs):
+    root = Path("/data")
+    fs.create_file(str(root / "docs" / "guide.md"))
+
+    assert _walked(root, include_dirs=True) == ["docs", "docs/guide.md"]
+
+
+def _age(path, seconds=1_000_000):
+    os.utime(path, (seconds, seconds))
+
+
+def test_metadata_cache_reuses_listing_until_directory_changes(fs):
+    fs.create_file("/data/a.txt")
+    _age("/data")
+    cache = MetadataCache()
+
+    first = [entry.name for entry in cache.listing("/data")]
+    second = [entry.name for entry in cache.listing("/data")]
+    fs.create_file("/data/b.txt")
+    _age("/data", 2_000_000)
+    third = sorted(entry.name for entry in cache.listing("/data"))
+
+    assert first == second == ["a.txt"]
+    assert third == ["a.txt", "b.txt"]
+    assert cache.hit_rates()["listing"] == (1, 2)
+
+
+def test_metadata_cache_skips_recently_modified_directories(fs):
+    fs.create_file("/fresh/a.txt")
+    cache = MetadataCache()
+
+    cache.listing("/fresh")
+    cache.listing("/fresh")
+
+    assert cache.hit_rates()["listing"] == (0, 2)
+
+
+def test_metadata_cache_lookup_and_resolve(fs):
+    fs.create_dir("/data/sub")
+    _age("/data")
+    cache = MetadataCache()
+
+    assert cache.is_dir(Path("/data/sub"))
+    assert not cache.exists(Path("/data/missing"))
+    assert cache.is_dir(Path("/data/sub"))
+    assert resolve_path("sub", Path("/data"), cache) == Path("/data/sub")
+    assert resolve_path("sub", Path("/data"), cache) == Path("/data/sub")
+
+    rates = cache.hit_rates()
+    assert rates["lookup"] == (1, 2)
+    assert rates["resolve"] == (1, 1)
+
+
+def test_metadata_cache_does_not_keep_paths_resolved_through_symlinks(fs):
+    fs.create_dir("/data/a/inner")
+    fs.create_dir("/data/b/inner")
+    fs.create_symlink("/data/link", "/data/a")
+    for directory in ("/data", "/data/a", "/data/b"):
+        _age(directory)
+    cache = MetadataCache()
+
+    assert cache.resolve("link/inner", Path("/data")) == Path("/data/a/inner")
+    os.remove("/data/link")
+    os.symlink("/data/b", "/data/link")
+    _age("/data")
+
+    assert cache.resolve("link/inner", Path("/data")) == Path("/data/b/inner")
+    assert cache.resolve("a/../b", Path("/data")) == Path("/data/b")
+    assert cache.resolve("a/../b", Path("/data")) == Path("/data/b")
+    assert cache.hit_rates()["resolve"] == (0, 4)
+
+
+def test_metadata_cache_invalidate_drops_subtree_and_parent(fs):
+    fs.create_file("/data/sub/a.txt")
+    _age("/data")
+    _age("/data/sub")
+    cache = MetadataCache()
+    cache.listing("/data")
+    cache.listing("/data/sub")
+    assert cache.exists(Path("/data/sub/a.txt"))
+
+    os.remove("/data/sub/a.txt")
+    os.rmdir("/data/sub")
+    _age("/data")
+    cache.invalidate(Path("/data/sub"))
+
+    assert cache.listing("/data") == []
+    assert not cache.exists(Path("/data/sub/a.txt"))
+
+
+def test_copy_file_uses_userspace_copy_for_fake_descriptors(fs):
+    fs.create_file("/data/source.bin", contents=b"payload")
+    os.utime("/data/source.bin", (1_000_000, 1_000_000))
+
+    assert copy_file("/data/source.bin", "/data/target.bin") == "userspace"
+    assert Path("/data/target.bin").read_bytes() == b"payload"
+    assert os.stat("/data/target.bin").st_mtime == 1_000_000
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="kernel copies are Linux-only")
+def test_copy_file_copies_inside_kernel(tmp_path):
+    source = tmp_path / "source.bin"
+    source.write_bytes(os.urandom(300_000))
+    os.chmod(source, 0o640)
+
+    mode = copy_file(source, tmp_path / "target.bin")
+
+    assert mode in {"reflink", "copy_file_range", "sendfile"}
+    assert (tmp_path / "target.bin").read_bytes() == source.read_bytes()
+    assert (tmp_path / "target.bin").stat().st_mode & 0o777 == 0o640
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="kernel copies are Linux-only")
+def test_copy_file_falls_back_when_kernel_calls_are_unsupported(tmp_path, monkeypatch):
+    def unsupported(*args):
+        raise OSError(errno.EXDEV, "cross-device copy")
+
+    source = tmp_path / "source.bin"
+    source.write_bytes(b"x" * 5000)
+    monkeypatch.setattr(utils, "_reflink", lambda source, target: False)
+    monkeypatch.setattr(os, "copy_file_range", unsupported, raising=False)
+    assert copy_file(source, tmp_path / "first.bin") == "sendfile"
+
+    monkeypatch.setattr(os, "sendfile", unsupported)
+    assert copy_file(source, tmp_path / "second.bin") == "userspace"
+    assert (tmp_path / "first.bin").read_bytes() == b"x" * 5000
+    assert (tmp_path / "second.bin").read_bytes() == b"x" * 5000
+
+
+def test_copy_file_rejects_same_file(fs):
+    fs.create_file("/data/source.bin", contents=b"payload")
+
+    with pytest.raises(OSError):
+        copy_file("/data/source.bin", "/data/source.bin")
+    assert Path("/data/source.bin").read_bytes() == b"payload"
+
+
+@pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="mkfifo is unavailable")
+def test_copy_file_rejects_named_pipes(tmp_path):
+    pipe = tmp_path / "pipe"
+    os.mkfifo(pipe)
+    regular = tmp_path / "regular.txt"
+    regular.write_text("payload")
+
+    with pytest.raises(shutil.SpecialFileError, match="is a named pipe"):
+        copy_file(pipe, tmp_path / "copy")
+    with pytest.raises(shutil.SpecialFileError, match="is a named pipe"):
+        copy_file(regular, pipe)
+    assert not (tmp_path / "copy").exists()
+
+
+def _make_sparse_file(path: Path, size: int, chunks: dict[int, bytes]) -> None:
+    with open(path, "wb") as handle:
+        handle.truncate(size)
+        for offset, data in chunks.items():
+            handle.seek(offset)
+            handle.write(data)
+    if os.stat(path).st_blocks * 512 >= size:
+        pytest.skip("filesystem does not support sparse files")
+
+
+@pytest.mark.skipif(not hasattr(os, "SEEK_DATA"), reason="SEEK_DATA is unavailable")
+def test_copy_file_keeps_holes_in_sparse_files(tmp_path, monkeypatch):
+    source = tmp_path / "disk.img"
+    size = 64 * 1024 * 1024
+    _make_sparse_file(source, size, {4096: b"head", 32 * 1024 * 1024: b"middle"})
+    monkeypatch.setattr(utils, "_reflink", lambda source, target: False)
+
+    assert copy_file(source, tmp_path / "copy.img") == "sparse"
+
+    copied = tmp_path / "copy.img"
+    assert copied.stat().st_size == size
+    assert copied.stat().st_blocks * 512 < size // 4
+    with open(copied, "rb") as handle:
+        handle.seek(4096)
+        assert handle.read(4) == b"head"
+        handle.seek(32 * 1024 * 1024)
+        assert handle.read(6) == b"middle"
+        handle.seek(size - 16)
+        assert handle.read() == b"\0" * 16
+
+
+@pytest.mark.skipif(not hasattr(os, "SEEK_DATA"), reason="SEEK_DATA is unavailable")
+def test_copy_file_copies_fully_sparse_file(tmp_path, monkeypatch):
+    source = tmp_path / "empty.img"
+    _make_sparse_file(source, 8 * 1024 * 1024, {})
+    monkeypatch.setattr(utils, "_reflink", lambda source, target: False)
+
+    assert copy_file(source, tmp_path / "copy.img") == "sparse"
+    assert (tmp_path / "copy.img").stat().st_size == 8 * 1024 * 1024
+
+
+def test_metadata_cache_evicts_least_recently_used_entries(fs):
+    for name in ("a", "b", "c"):
+        fs.create_dir(f"/data/{name}")
+        _age(f"/data/{name}")
+    cache = MetadataCache(size=2)
+    cache.listing("/data/a")
+    cache.listing("/data/b")
+    cache.listing("/data/a")
+
+    cache.listing("/data/c")
+    cache.listing("/data/a")
+    cache.listing("/data/b")
+
+    assert cache.hit_rates()["listing"] == (2, 4)
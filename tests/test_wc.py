@@ -0,0 +1,69 @@
+import pytest
+
+from src import config
+from src.commands import wc
+from src.commands.utils import CommandError
+
+
+def _collect(args, shell):
+    return "".join(wc.run(args, shell)).splitlines()
+
+
+def test_wc_counts_lines_words_and_bytes(fs, shell):
+    fs.create_file(str(shell.cwd / "notes.txt"), contents="one two\nthree\n")
+
+    assert _collect(["notes.txt"], shell) == [" 2  3 14 notes.txt"]
+    assert _collect(["-l", "notes.txt"], shell) == [" 2 notes.txt"]
+    assert _collect(["-wc", "notes.txt"], shell) == [" 3 14 notes.txt"]
+
+
+def test_wc_counts_words_split_across_chunks(fs, shell, monkeypatch):
+    monkeypatch.setattr(config, "WC_CHUNK_SIZE", 3)
+    text = "alpha beta\tgamma\n  delta epsilon\nzeta"
+    fs.create_file(str(shell.cwd / "words.txt"), contents=text)
+
+    [line] = _collect(["words.txt"], shell)
+
+    assert line.split() == ["2", "6", str(len(text)), "words.txt"]
+
+
+def test_wc_reports_each_file_and_total(fs, shell, monkeypatch):
+    monkeypatch.setattr(config, "WC_WORKERS", 4)
+    for number in range(5):
+        fs.create_file(
+            str(shell.cwd / f"f{number}.log"), contents="x\n" * (number + 1))
+
+    lines = _collect(["-l"] + [f"f{number}.log" for number in range(5)], shell)
+
+    assert [line.split() for line in lines] == [
+        ["1", "f0.log"],
+        ["2", "f1.log"],
+        ["3", "f2.log"],
+        ["4", "f3.log"],
+        ["5", "f4.log"],
+        ["15", "total"],
+    ]
+
+
+def test_wc_bytes_only_uses_file_size(fs, shell, monkeypatch):
+    fs.create_file(str(shell.cwd / "big.bin"), contents=b"\0" * 4096)
+
+    def fail(*_args):
+        raise AssertionError("file was read")
+
+    monkeypatch.setattr(wc, "read_chunks", fail)
+
+    assert _collect(["-c", "big.bin"], shell) == ["4096 big.bin"]
+
+
+def test_wc_rejects_bad_arguments(fs, shell):
+    fs.create_dir(str(shell.cwd / "docs"))
+
+    with pytest.raises(CommandError, match="Usage: wc"):
+        wc.run(["-l"], shell)
+    with pytest.raises(CommandError, match="unsupported option"):
+        wc.run(["-x", "file"], shell)
+    with pytest.raises(CommandError, match="not found"):
+        wc.run(["missing"], shell)
+    with pytest.raises(CommandError, match="is a directory"):
+        wc.run(["docs"], shell)